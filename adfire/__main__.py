@@ -1,8 +1,88 @@
 import argparse
-import importlib
+import contextlib
+import datetime
+import importlib.metadata
+import os
 import sys
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING
 
-from adfire.portfolio import Portfolio
+from adfire.config import VALIDATION_LEVELS, init_portfolio_dir
+
+# modes load pandas, pandera, matplotlib and the HTTP client and server only when they need them, so the CLI starts fast
+if TYPE_CHECKING:
+    from adfire.portfolio import Portfolio
+
+
+def bench(args):
+    """
+    Benchmarks the portfolio in the path if any, otherwise a portfolio generated
+    with the given size.
+    """
+    from adfire.bench import generate_portfolio, run_benchmarks
+
+    path = Path(args.path)
+    with tempfile.TemporaryDirectory() as tmp:
+        if not (path / 'portfolio.json').is_file():
+            path = Path(tmp)
+            generate_portfolio(
+                path,
+                accounts=args.accounts,
+                years=args.years,
+                entries_per_year=args.entries_per_year,
+                repeat_share=args.repeat_share,
+                transfer_share=args.transfer_share,
+                hashed_share=args.hashed_share,
+                seed=args.seed
+            )
+        results = run_benchmarks(path, rounds=args.rounds)
+    print(results.to_string(index=False))
+
+
+def watch(portfolio: 'Portfolio'):
+    """Prints results of linting the portfolio whenever entry files change"""
+    try:
+        for result in portfolio.watch():
+            timestamp = datetime.datetime.now().strftime('%H:%M:%S')
+            if isinstance(result, Exception):
+                print(f'[{timestamp}] {type(result).__name__}: {result}', flush=True)
+            else:
+                print(f'[{timestamp}] Linted {len(result)} entries', flush=True)
+    except KeyboardInterrupt:
+        pass
+
+
+def split_views(tokens: list[str]) -> list[tuple[str, list[str]]]:
+    """Splits view modules and their arguments, separated by '+', into pairs of module and arguments"""
+    views = [[]]
+    for token in tokens:
+        if token == '+':
+            views.append([])
+        else:
+            views[-1].append(token)
+    return [(view[0], view[1:]) for view in views if view]
+
+
+def delegate(args) -> bool:
+    """
+    Sends the command to the daemon serving the portfolio, if any and linting with
+    the validation, cache and force options of the command, and prints its output.
+    Returns whether a daemon ran the command.
+    """
+    from adfire.serve import ServeError, request_server
+
+    request = {'command': args.mode, 'cwd': os.getcwd()}
+    if args.mode == 'view':
+        request.update(views=split_views([args.module, *args.args]))
+    settings = {'validation': args.validate, 'use_cache': args.cache, 'forced_hash': bool(args.force)}
+    response = request_server(args.path, request, settings=settings)
+    if response is None:
+        return False
+    print(response['output'], end='')
+    if response['error']:
+        raise ServeError(response['error'])
+    return True
 
 
 def main():
@@ -10,12 +90,62 @@ def main():
     parser.add_argument(
         'mode',
         help='command modes',
-        choices=['init', 'lint', 'format', 'view'])
+        choices=['init', 'lint', 'format', 'view', 'bench', 'serve'])
     if 'view' in sys.argv:
         parser.add_argument(
             'module',
             help='view module')
-        parser.add_argument('args', nargs='*')
+        parser.add_argument(
+            'args',
+            help="arguments and options of the view module, and more views after '+'",
+            nargs='*')
+    if 'bench' in sys.argv:
+        parser.add_argument(
+            '--accounts',
+            help='number of accounts of a generated portfolio, default to 4',
+            default=4,
+            type=int)
+        parser.add_argument(
+            '--years',
+            help='number of years of a generated portfolio, default to 1',
+            default=1,
+            type=int)
+        parser.add_argument(
+            '--entries-per-year',
+            help='number of entries per account and year of a generated portfolio, default to 250',
+            default=250,
+            type=int)
+        parser.add_argument(
+            '--repeat-share',
+            help='share of entries that are occurrences of repeat rules, default to 0.1',
+            default=0.1,
+            type=float)
+        parser.add_argument(
+            '--transfer-share',
+            help='share of entries that are transfers between accounts, default to 0.1',
+            default=0.1,
+            type=float)
+        parser.add_argument(
+            '--hashed-share',
+            help='share of entries that are hashed, default to 0',
+            default=0.0,
+            type=float)
+        parser.add_argument(
+            '--seed',
+            help='random seed of a generated portfolio, default to 0',
+            default=0,
+            type=int)
+        parser.add_argument(
+            '--rounds',
+            help='number of rounds to time each stage, the fastest is reported, default to 1',
+            default=1,
+            type=int)
+    if 'serve' in sys.argv:
+        parser.add_argument(
+            '--port',
+            help='localhost port to serve on, default to any free port',
+            default=0,
+            type=int)
     parser.add_argument(
         '-p', '--path',
         help='portfolio path, default to current directory',
@@ -25,25 +155,109 @@ def main():
         '-f', '--force',
         help='force format of hashed entries',
         action=argparse.BooleanOptionalAction)
+    parser.add_argument(
+        '-j', '--jobs',
+        help='number of threads reading entry files and processes linting accounts, default to 1',
+        default=1,
+        type=int)
+    parser.add_argument(
+        '--cache',
+        help='reuse results of the last lint for unchanged accounts, default to true',
+        default=True,
+        action=argparse.BooleanOptionalAction)
+    parser.add_argument(
+        '--validate',
+        help='how often entries are validated, default to full',
+        choices=VALIDATION_LEVELS,
+        default='full')
+    parser.add_argument(
+        '-a', '--account',
+        help='only read and lint entry files of this account and accounts paired with it, can be repeated',
+        action='append',
+        dest='accounts')
+    parser.add_argument(
+        '--since',
+        help='only report entries from this date, as YYYY-MM-DD; older unchanged entry files are taken from the cache',
+        type=datetime.date.fromisoformat)
+    parser.add_argument(
+        '--until',
+        help='only report entries until this date, as YYYY-MM-DD',
+        type=datetime.date.fromisoformat)
+    parser.add_argument(
+        '--watch',
+        help='lint again whenever entry files change, until interrupted',
+        action='store_true')
+    parser.add_argument(
+        '--stream',
+        help='lint and format one group of accounts at a time to bound memory, without the lint cache',
+        action='store_true')
+    parser.add_argument(
+        '--profile',
+        help="record time, rows and peak memory of each stage to '.reports/profile.json'",
+        action='store_true')
     parser.add_argument(
         '-v', '--version',
         action='version',
         version=f'%(prog)s {importlib.metadata.version("adfire")}')
 
-    args = parser.parse_args()
+    args, unknown_args = parser.parse_known_args()
+    if args.mode == 'view':
+        args.args += unknown_args  # options of the view module, such as '--format'
+    elif unknown_args:
+        parser.error(f'unrecognized arguments: {" ".join(unknown_args)}')
+    if args.mode == 'serve' and (args.accounts or args.since or args.until):
+        parser.error("a served portfolio can't be filtered by --account, --since or --until")
+
+    if args.mode == 'bench':
+        bench(args)
+        return
+
+    # commands are run by a daemon serving the portfolio, if any and linting with the same settings
+    is_local = args.watch or args.stream or args.profile or args.accounts or args.since or args.until
+    if args.mode in ['lint', 'view'] and not is_local and delegate(args):
+        return
+
+    if args.mode == 'init':
+        init_portfolio_dir(args.path)
+        return
+
+    import pandas as pd
 
-    portfolio = Portfolio.from_new(args.path) if args.mode == 'init' else Portfolio(args.path)
+    from adfire.portfolio import Portfolio
+    from adfire.serve import serve
+    from adfire.stages import StageProfiler
+
+    portfolio = Portfolio(args.path, jobs=args.jobs, accounts=args.accounts, since=args.since, until=args.until,
+                          validation=args.validate)
     portfolio.forced_hash = args.force
-    if args.mode == 'lint':
-        portfolio.lint()
-    elif args.mode == 'format':
-        portfolio.format()
-    elif args.mode == 'view':
-        try:
-            module_name = f'adfire.{args.module}'  # try with default modules first
-            portfolio.view(module_name, *args.args)
-        except ImportError:
-            portfolio.view(args.module, *args.args)
+    portfolio.use_cache = args.cache
+    portfolio.streaming = args.stream
+
+    profiler = StageProfiler() if args.profile else None
+    profile_path = portfolio.path.resolve() / '.reports' / 'profile.json'  # views change the working directory
+    if profiler:
+        portfolio.add_stage_hook(profiler)
+
+    # copies of frames share data until either is modified, so copies of linted entries handed to views are cheap
+    with pd.option_context('mode.copy_on_write', True), profiler or contextlib.nullcontext():
+        if args.mode == 'lint' and args.watch:
+            watch(portfolio)
+        elif args.mode == 'lint' and args.stream:
+            for _ in portfolio.iter_lint():
+                pass
+        elif args.mode == 'lint':
+            portfolio.lint()
+        elif args.mode == 'format':
+            n_written = portfolio.format()
+            print(f'{n_written} entry file{"" if n_written == 1 else "s"} formatted')
+        elif args.mode == 'serve':
+            serve(portfolio, port=args.port)
+        elif args.mode == 'view':
+            portfolio.view_all(split_views([args.module, *args.args]))
+
+    if profiler:
+        profiler.write(profile_path)
+        print(profiler.to_frame().to_string(index=False))
 
 
 if __name__ == '__main__':
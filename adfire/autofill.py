@@ -1,163 +1,390 @@
 import uuid
+from functools import lru_cache
+from typing import Optional, Union
 
 import numpy as np
 import pandas as pd
-from dateutil.rrule import rrulestr
-from pandas.testing import assert_series_equal
+from dateutil.rrule import rrulestr, rrule, rruleset
 from pandera.typing import DataFrame
 
-from adfire.schema import MergedInputEntrySchema, HashableEntrySchema
+from adfire.hashing import hash_rows
+from adfire.schema import MergedInputEntrySchema, HashableEntrySchema, required_columns, schema_columns
 
 
 def sort_entries(df: DataFrame[MergedInputEntrySchema]) -> DataFrame[MergedInputEntrySchema]:
     return df.sort_values(by=['date', 'entry_id'], ascending=[True, True])
 
 
-def post_repeat_entries(df: DataFrame[MergedInputEntrySchema]) -> DataFrame[MergedInputEntrySchema]:
-    df['date'] = pd.to_datetime(df['date'])
+@lru_cache(maxsize=None)
+def _parse_repeat(repeat: str) -> Union[rrule, rruleset]:
+    return rrulestr(repeat)
+
+
+def _get_occurrence_dates(repeat: str, dtstart: pd.Timestamp, dtend: pd.Timestamp) -> tuple[np.ndarray, bool]:
+    """
+    Returns dates of occurrences of a repeat rule from dtstart up to the first one
+    after dtend, and whether there is one after dtend.
+    """
+    dtstart = dtstart.to_pydatetime()
+    dtend = dtend.to_pydatetime()
+    rule = _parse_repeat(repeat)
+    if isinstance(rule, rrule):
+        rule = rule.replace(dtstart=dtstart)
+    else:
+        rule = rrulestr(repeat, dtstart=dtstart)  # rule sets can't be rebased, parse again
+
+    dates = [dtstart]
+    dates += rule.between(dtstart, dtend)
+    next_date = rule.after(dtend)
+    if next_date is not None:
+        dates.append(next_date)
+    return np.array(dates, dtype='datetime64[ns]'), next_date is not None
+
+
+def post_repeat_entries(df: DataFrame[MergedInputEntrySchema], validate: bool = True) -> DataFrame[MergedInputEntrySchema]:
+    df = df.assign(date=pd.to_datetime(df['date']))
+
+    # mask repeat entries within latest posted dates of their accounts
+    mask_posted = df['status'] == 'posted'
+    latest_posted_dates = df['date'].where(mask_posted).groupby(df['account_name'], observed=True).transform('max')
+    mask_repeat = df['repeat'].notna() & (df['date'] <= latest_posted_dates)
+    repeat_df = df[mask_repeat]
+
+    # compute occurrence dates of all repeat entries, each distinct rule is parsed once
+    occurrences = [
+        _get_occurrence_dates(repeat, date, latest_posted_date)
+        for repeat, date, latest_posted_date in zip(
+            repeat_df['repeat'],
+            repeat_df['date'],
+            latest_posted_dates[mask_repeat]
+        )
+    ]
+    counts = np.array([len(dates) for dates, _ in occurrences], dtype=int)
+    has_pending = np.array([pending for _, pending in occurrences], dtype=bool)
+
+    # repeat each repeat entry for each of its occurrences
+    occurrences_df = repeat_df.reset_index().iloc[np.repeat(np.arange(len(repeat_df)), counts)]
+    occurrences_df = occurrences_df.reset_index(drop=True)
+    occurrences_df['date'] = np.concatenate([dates for dates, _ in occurrences]) if occurrences else []
+
+    # the first occurrence is the repeat entry itself, the last is pending if the rule hasn't ended
+    position = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    mask_first = position == 0
+    mask_pending = (position == np.repeat(counts - 1, counts)) & np.repeat(has_pending, counts)
+    occurrences_df['status'] = np.where(mask_pending, 'pending', 'posted')
+    occurrences_df['repeat'] = occurrences_df['repeat'].where(mask_pending, np.nan)
+
+    # assign new entry IDs to other occurrences, following the last entry ID of their paths
+    next_entry_ids = df.index.to_frame(index=False).groupby('path')['entry_id'].max() + 1
+    new_df = occurrences_df[~mask_first]
+    occurrences_df.loc[~mask_first, 'entry_id'] = (
+            new_df['path'].map(next_entry_ids) + new_df.groupby('path').cumcount())
+    occurrences_df = occurrences_df.set_index(['path', 'entry_id'])
+
+    # replace repeat entries with their occurrences; need to add this if to suppress FutureWarning
+    if not occurrences_df.empty:
+        df = pd.concat([df[~mask_repeat], occurrences_df])
 
-    def get_occurrence_dates(repeat, dtstart, dtend):
-        rruleo = rrulestr(repeat, dtstart=dtstart)
-        dates = [dtstart]
-        dates += rruleo.between(dtstart, dtend)
-        dates.append(rruleo.after(dtend))
-        dates = [pd.to_datetime(x) for x in dates]
-        return dates
+    # clean up
+    df = sort_entries(df)
+    df['date'] = df['date'].dt.date
+    if validate:
+        df = MergedInputEntrySchema.validate(df)
 
-    for account, group_df in df.groupby('account_name'):
-        # mask entries for non-null repeat rules
-        mask_repeat = group_df['repeat'].notna()
-        repeat_df = group_df[mask_repeat].reset_index()
+    return df
 
-        # mask entries for posted
-        mask_posted = group_df['status'] == 'posted'
-        posted_df = group_df[mask_posted]
 
-        # mask repeat entries for within latest posted dates
-        latest_posted_date = posted_df.iloc[-1]['date'] if len(posted_df) else pd.Timestamp.min
-        mask_posted_date = repeat_df['date'] <= latest_posted_date
-        repeat_df = repeat_df[mask_posted_date]
+def _kahan_cumsum(
+        values: pd.Series,
+        groups: pd.Series,
+        sums: Optional[pd.Series] = None,
+        compensations: Optional[pd.Series] = None
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Cumulative sums of values per group, with the same compensated summation as
+    pandas' groupby cumsum, so sums resumed from the sums and compensations of
+    each group at an earlier entry have the same bits as sums from the first
+    entry. NaN values are skipped. Returns the sums, NaN where values are, and
+    the sums and compensations of the group after each value.
+    """
+    totals = {} if sums is None else sums.to_dict()
+    errors = {} if compensations is None else compensations.to_dict()
+    out = np.empty(len(values))
+    out_totals = np.empty(len(values))
+    out_errors = np.empty(len(values))
+    for i, (value, group) in enumerate(zip(values.tolist(), groups.tolist())):
+        total = totals.get(group, 0.0)
+        error = errors.get(group, 0.0)
+        if value == value:  # not NaN
+            y = value - error
+            t = total + y
+            error = t - total - y
+            total = t
+            totals[group] = total
+            errors[group] = error
+            out[i] = total
+        else:
+            out[i] = np.nan
+        out_totals[i] = total
+        out_errors[i] = error
+    return out, out_totals, out_errors
+
+
+def _cumsum(values: pd.Series, accounts: pd.Series, openings: Optional[pd.DataFrame], name: str) -> pd.Series:
+    """Cumulative sums of values per account, resumed from the sums named name of openings, if any"""
+    if openings is None:
+        return values.groupby(accounts, observed=True).cumsum()
+    sums, _, _ = _kahan_cumsum(values, accounts, openings[f'{name}_sum'], openings[f'{name}_compensation'])
+    return pd.Series(sums, index=values.index)
+
+
+def _fill_current_balances(
+        df: DataFrame[MergedInputEntrySchema],
+        openings: Optional[pd.DataFrame] = None
+) -> DataFrame[MergedInputEntrySchema]:
+    accounts = df['account_name']
+
+    # calculate current balances from posted amounts, carried over to unposted entries
+    mask_posted = df['status'] == 'posted'
+    computed_bal = _cumsum(df['amount'].where(mask_posted), accounts, openings, 'posted')
+    computed_bal = computed_bal.groupby(accounts, observed=True).ffill()
+    if openings is not None:  # carried over from entries before openings
+        computed_bal = computed_bal.fillna(accounts.map(openings['posted_sum']).astype(float))
+    computed_bal = computed_bal.fillna(0)
+
+    # manage offsets per account, taken from the first input balance
+    input_bal = df['balance_current']
+    mask_filled = input_bal.notna()
+    computed_offsets = (input_bal - computed_bal).round(2)
+    offsets = computed_offsets.groupby(accounts, observed=True).transform('first')
+    if openings is not None:
+        offsets = accounts.map(openings['offset_current']).astype(float).fillna(offsets)
+
+    # verify all offsets of an account are equal
+    mask_mismatched = mask_filled & ~np.isclose(computed_offsets, offsets)
+
+    # offset computed bal
+    computed_bal = computed_bal + offsets.fillna(0)
+
+    # verify input balance match computed
+    mask_mismatched |= mask_filled & ~np.isclose(computed_bal, input_bal)
+    mismatched_accounts = accounts[mask_mismatched].unique()
+    assert not len(mismatched_accounts), \
+        f"Current balances don't match computed for accounts: {', '.join(mismatched_accounts)}"
+
+    # replace input current balance column with computed
+    df['balance_current'] = computed_bal
 
-        # transform repeat entries columns into list for pandas.DataFrame.explode
-        repeat_df['date'] = [get_occurrence_dates(repeat, date, latest_posted_date) for repeat, date in zip(repeat_df['repeat'], repeat_df['date'])]
-        repeat_df['status'] = [['pending' if i == len(date) - 1 else 'posted' for i, d in enumerate(date)] for date in repeat_df['date']]
-        repeat_df['repeat'] = [[repeat if i == len(date) - 1 else np.nan for i, d in enumerate(date)] for date, repeat in zip(repeat_df['date'], repeat_df['repeat'])]
-        repeat_df['entry_id'] = [[entry_id if i == 0 else len(group_df) + i - 1 for i, d in enumerate(date)] for date, entry_id in zip(repeat_df['date'], repeat_df['entry_id'])]
+    return df
 
-        # explode list-like repeat entries to individual rows
-        occurrences_df = repeat_df.explode(['entry_id', 'date', 'status', 'repeat'], ignore_index=True)
-        occurrences_df = occurrences_df.set_index(['path', 'entry_id'])
 
-        # add occurrences into original df; need to add this if-else to suppress FutureWarning
-        occurrences_df = occurrences_df.astype(df.dtypes) if occurrences_df.empty else occurrences_df
-        df = df.loc[~df.index.isin(occurrences_df.index)]
-        df = pd.concat([df, occurrences_df])
+def _fill_total_balances(
+        df: DataFrame[MergedInputEntrySchema],
+        balance_cumsum: pd.Series,
+        openings: Optional[pd.DataFrame] = None
+) -> DataFrame[MergedInputEntrySchema]:
+    first = df.groupby('account_name', observed=True).first()
+    initial_balance = first['balance_current'] - first['amount']
+    if openings is not None:
+        initial_balance = openings['initial_total'].combine_first(initial_balance)
+    df['balance_total'] = balance_cumsum + df['account_name'].map(initial_balance).astype(float)
+    return df
 
-    # clean up
-    df = sort_entries(df)
-    df = MergedInputEntrySchema.validate(df)
 
-    return df
+def _fill_available_balances(
+        df: DataFrame[MergedInputEntrySchema],
+        balance_cumsum: pd.Series,
+        openings: Optional[pd.DataFrame] = None
+) -> DataFrame[MergedInputEntrySchema]:
+    # calculate offsets for each account. IMPORTANT: assumes current balances are correctly filled
+    first_entries = df.groupby('account_name', observed=True).first()
+    mask_is_posted = first_entries['status'] == 'posted'
+    offsets = first_entries['balance_current'] - np.where(mask_is_posted, first_entries['amount'], 0)
+    if openings is not None:
+        offsets = openings['offset_available'].combine_first(offsets)
+    offset_cumsum = balance_cumsum + df['account_name'].map(offsets).astype(float)
 
+    # calculate available balances for credit and depository types
+    mask_is_credit = df['account_type'] == 'credit'
+    mask_is_depository = df['account_type'] == 'depository'
+    computed_bal = pd.Series(
+        data=np.select(
+            [mask_is_credit, mask_is_depository],
+            [df['balance_limit'] - offset_cumsum, offset_cumsum],
+            default=np.nan
+        ),
+        index=df.index
+    )
 
-def fill_current_balances(df: DataFrame[MergedInputEntrySchema]) -> DataFrame[MergedInputEntrySchema]:
-    # calculate current balances
-    for account, group in df.groupby('account_name'):
-        mask_posted = group['status'] == 'posted'
-        posted_curr_bal = group[mask_posted]['amount'].cumsum()
-        group.loc[posted_curr_bal.index, '_balance_current'] = posted_curr_bal
-        group['_balance_current'] = group['_balance_current'].ffill().fillna(0)
-        df.loc[group['_balance_current'].index, '_balance_current'] = group['_balance_current']
-
-    # manage offsets per account
-    _df = df[['account_name', 'balance_current', '_balance_current']]
-    for account, group in _df.groupby('account_name'):
-        mask_balance_filled = group['balance_current'].notna()
-        filled_input_bal = group.loc[mask_balance_filled, 'balance_current']
-        filled_computed_bal = group.loc[mask_balance_filled, '_balance_current']
-        computed_offsets = (filled_input_bal - filled_computed_bal).round(2)
-
-        if not computed_offsets.empty:
-            # verify all offsets are equal
-            offset = computed_offsets.iloc[0]
-            expected_offsets = pd.Series(
-                data=offset,
-                index=computed_offsets.index,
-                dtype=computed_offsets.dtype
-            )
-            assert_series_equal(computed_offsets, expected_offsets, check_names=False)
-
-            # offset computed bal
-            group['_balance_current'] = group['_balance_current'] + offset
-
-        # verify input balance match computed
-        filled_offset_computed_bal = group.loc[mask_balance_filled, '_balance_current']
-        assert_series_equal(filled_offset_computed_bal, filled_input_bal, check_names=False)
-
-        # replace input current balance column with computed
-        df.loc[group['_balance_current'].index, 'balance_current'] = group['_balance_current']
+    # verify input available balance match computed
+    input_bal = df['balance_available']
+    mask_mismatched = input_bal.notna() & ~np.isclose(computed_bal, input_bal)
+    mismatched_accounts = df.loc[mask_mismatched, 'account_name'].unique()
+    assert not len(mismatched_accounts), \
+        f"Available balances don't match computed for accounts: {', '.join(mismatched_accounts)}"
 
-    # clean up
-    df = MergedInputEntrySchema.validate(df)
+    # replace input available balance column with computed
+    df['balance_available'] = computed_bal
 
     return df
 
 
-def fill_total_balances(df: DataFrame[MergedInputEntrySchema]) -> DataFrame[MergedInputEntrySchema]:
-    grouped_by_account = df.groupby('account_name')
-    first = grouped_by_account.first()
-    initial_balance = first['balance_current'] - first['amount']
-    df['balance_total'] = grouped_by_account['amount'].cumsum() + df['account_name'].map(initial_balance)
-    df = MergedInputEntrySchema.validate(df)
+def fill_current_balances(df: DataFrame[MergedInputEntrySchema], validate: bool = True) -> DataFrame[MergedInputEntrySchema]:
+    df = _fill_current_balances(df)
+    if validate:
+        df = MergedInputEntrySchema.validate(df)
     return df
 
 
-def fill_available_balances(df: DataFrame[MergedInputEntrySchema]) -> DataFrame[MergedInputEntrySchema]:
-    grouped_by_account = df.groupby('account_name')
+def fill_total_balances(df: DataFrame[MergedInputEntrySchema], validate: bool = True) -> DataFrame[MergedInputEntrySchema]:
+    balance_cumsum = df.groupby('account_name', observed=True)['amount'].cumsum()
+    df = _fill_total_balances(df, balance_cumsum)
+    if validate:
+        df = MergedInputEntrySchema.validate(df)
+    return df
 
-    # calculate temporary cumsum of amounts
-    df['_balance_cumsum'] = grouped_by_account['amount'].cumsum()
 
-    # calculate available balances for credit types
-    mask_is_credit = df['account_type'] == 'credit'
-    credit_masked = df[mask_is_credit]
-    df.loc[mask_is_credit, '_balance_available'] = (
-            credit_masked['balance_limit'] - credit_masked['_balance_cumsum'])
+def fill_available_balances(df: DataFrame[MergedInputEntrySchema], validate: bool = True) -> DataFrame[MergedInputEntrySchema]:
+    balance_cumsum = df.groupby('account_name', observed=True)['amount'].cumsum()
+    df = _fill_available_balances(df, balance_cumsum)
+    if validate:
+        df = MergedInputEntrySchema.validate(df)
+    return df
 
-    # calculate available balances for depository types
-    mask_is_depository = df['account_type'] == 'depository'
-    depository_masked = df[mask_is_depository]
-    df.loc[mask_is_depository, '_balance_available'] = depository_masked['_balance_cumsum']
 
-    # calculate offsets for each account. IMPORTANT: assumes current balances are correctly filled
-    first_entries = grouped_by_account.first()
-    mask_is_posted = first_entries['status'] == 'posted'
-    offsets = first_entries['balance_current'] - np.where(mask_is_posted, first_entries['amount'], 0)
-    offsets.name = '_balance_offset'
-    df = df.join(offsets, on='account_name')
+def fill_balances(
+        df: DataFrame[MergedInputEntrySchema],
+        validate: bool = True,
+        openings: Optional[pd.DataFrame] = None
+) -> DataFrame[MergedInputEntrySchema]:
+    """
+    Fills current, total and available balances in one stage. Total and available
+    balances share one cumulative sum of amounts per account.
+
+    If openings are given, a row of balance_checkpoints per account, entries of
+    those accounts follow that checkpoint and their balances resume from it.
+    """
+    df = _fill_current_balances(df, openings)
+    balance_cumsum = _cumsum(df['amount'], df['account_name'], openings, 'amount')
+    df = _fill_total_balances(df, balance_cumsum, openings)
+    df = _fill_available_balances(df, balance_cumsum, openings)
+    if validate:
+        df = MergedInputEntrySchema.validate(df)
+    return df
 
-    # apply offsets to available balances
-    df.loc[mask_is_credit, '_balance_available'] = df['_balance_available'] - df['_balance_offset']
-    df.loc[mask_is_depository, '_balance_available'] = df['_balance_available'] + df['_balance_offset']
 
-    # verify input available balance match computed
-    input_bal = df['balance_available']
-    mask_filled = input_bal.notnull()
-    filled_input_bal = input_bal[mask_filled]
-    filled_computed_bal = df.loc[mask_filled, '_balance_available']
-    assert_series_equal(filled_computed_bal, filled_input_bal, check_names=False)
+def balance_checkpoints(
+        df: DataFrame[MergedInputEntrySchema],
+        openings: Optional[pd.DataFrame] = None
+) -> pd.DataFrame:
+    """
+    Returns a checkpoint of each account at the end of each month it has entries:
+    balances and hash of its last entry that month, and the sums and offsets
+    fill_balances had there, so later entries can be filled from a checkpoint
+    with the same results as from the first entry. Entries must be linted and
+    sorted, and follow openings, if given.
+    """
+    accounts = df['account_name'].astype(object)  # empty categoricals can't be cast to str
+    amounts = df['amount']
+    mask_posted = df['status'] == 'posted'
+    _, posted_sums, posted_errors = _kahan_cumsum(
+        amounts.where(mask_posted), accounts,
+        *([] if openings is None else [openings['posted_sum'], openings['posted_compensation']])
+    )
+    _, amount_sums, amount_errors = _kahan_cumsum(
+        amounts, accounts,
+        *([] if openings is None else [openings['amount_sum'], openings['amount_compensation']])
+    )
 
-    # replace input available balance column with computed
-    df['balance_available'] = df['_balance_available']
-    df = df.drop(['_balance_cumsum', '_balance_available'], axis=1)
+    # offsets of fill_balances are taken from the first entry of each account, which has an input balance once formatted
+    first = pd.DataFrame({
+        'account_name': accounts,
+        'posted_sum': posted_sums,
+        'amount': amounts,
+        'status': df['status'],
+        'balance_current': df['balance_current'],
+    }).drop_duplicates('account_name').set_index('account_name')
+    offsets = (first['balance_current'] - first['posted_sum']).round(2)
+    computed_bal = first['posted_sum'] + offsets
+    offsets = pd.DataFrame({
+        'offset_current': offsets,
+        'initial_total': computed_bal - first['amount'],
+        'offset_available': computed_bal - np.where(first['status'] == 'posted', first['amount'], 0),
+    })
+    if openings is not None:
+        offsets = openings[offsets.columns].combine_first(offsets)
+
+    checkpoints = pd.DataFrame({
+        'date': (pd.to_datetime(df['date']) + pd.offsets.MonthEnd(0)).dt.date.to_numpy(),
+        'account_name': accounts.to_numpy(),
+        'posted_sum': posted_sums,
+        'posted_compensation': posted_errors,
+        'amount_sum': amount_sums,
+        'amount_compensation': amount_errors,
+        'balance_current': df['balance_current'].to_numpy(),
+        'balance_total': df['balance_total'].to_numpy(),
+        'balance_available': df['balance_available'].to_numpy(),
+        'hash': df['hash'].array,
+    })
+    checkpoints = checkpoints.drop_duplicates(['date', 'account_name'], keep='last')
+    checkpoints = checkpoints.join(offsets, on='account_name')
+    return checkpoints.reset_index(drop=True)
+
+
+def _pair_transfers(help_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pairs each entry with the next entry of the opposite side of the same transfer
+    (same source, destination and absolute worth) within a week, unless that entry
+    is paired with an earlier one. Entries are matched with a linear scan over
+    entries sorted by transfer and date, instead of joining all pairs of entries.
+    """
+    keys = ['_from', '_to', '_worth_absolute']
+    help_df = help_df.sort_values(by=[*keys, 'date', '_id'], kind='stable')
+    transfers = help_df.groupby(keys, sort=False).ngroup().to_numpy()
+
+    # find position of the next entry on the opposite side of the same transfer
+    position = pd.Series(np.arange(len(help_df)))
+    is_source = help_df['_is_source'].to_numpy()
+    next_source = position.where(is_source).groupby(transfers).bfill()
+    next_target = position.where(~is_source).groupby(transfers).bfill()
+    next_opposite = np.where(is_source, next_target, next_source)
+
+    # filter out pairs that are not within a week
+    mask_paired = ~np.isnan(next_opposite)
+    open_df = help_df[mask_paired]
+    close_df = help_df.iloc[next_opposite[mask_paired].astype(int)]
+    dates_open = pd.to_datetime(open_df['date']).to_numpy()
+    dates_close = pd.to_datetime(close_df['date']).to_numpy()
+    mask_within_a_week = (dates_close - dates_open) < np.timedelta64(7, 'D')
+
+    columns = ['_id', 'transaction_id', 'hash']
+    paired_df = pd.concat(
+        [
+            open_df[columns].add_suffix('_open').reset_index(drop=True),
+            close_df[columns].add_suffix('_close').reset_index(drop=True)
+        ],
+        axis=1
+    )
+    paired_df = paired_df[mask_within_a_week]
 
-    # clean up
-    df = MergedInputEntrySchema.validate(df)
+    # an entry closes at most one pair, the earliest one
+    paired_df = paired_df.sort_values(by='_id_open')
+    paired_df = paired_df.drop_duplicates(subset=['_id_close'])
 
-    return df
+    # an entry that closes a pair can't open another one
+    closed = set()
+    mask_chained = np.zeros(len(paired_df), dtype=bool)
+    for i, (id_open, id_close) in enumerate(zip(paired_df['_id_open'], paired_df['_id_close'])):
+        if id_open in closed:
+            mask_chained[i] = True
+        else:
+            closed.add(id_close)
+    paired_df = paired_df[~mask_chained]
+
+    return paired_df
 
 
-def assign_transactions(df: DataFrame[MergedInputEntrySchema]) -> DataFrame[MergedInputEntrySchema]:
+def assign_transactions(df: DataFrame[MergedInputEntrySchema], validate: bool = True) -> DataFrame[MergedInputEntrySchema]:
     # assign universal index to each entry regardless of path
     indexed_df = df.reset_index()
     indexed_df['_id'] = indexed_df.index
@@ -175,27 +402,7 @@ def assign_transactions(df: DataFrame[MergedInputEntrySchema]) -> DataFrame[Merg
     help_df['_is_source'] = help_df['_worth'] < 0
 
     # pair possible transaction entries into one row
-    paired_df = help_df.merge(
-        help_df,
-        how='inner',
-        on=['_worth_absolute', '_from', '_to'],
-        suffixes=('_open', '_close')
-    )
-
-    # filter out pair rows that are not possibly transactions
-    mask_self_match = paired_df['_id_open'] == paired_df['_id_close']
-    mask_reverse = paired_df['_id_open'] > paired_df['_id_close']
-    mask_equal_source = paired_df['_is_source_open'] == paired_df['_is_source_close']
-    mask_within_a_week = (paired_df['date_close'] - paired_df['date_open']) < pd.Timedelta(days=7)
-    mask_zero_sum_worth = paired_df['_worth_open'] + paired_df['_worth_close'] == 0
-    paired_df = paired_df[
-        ~mask_self_match &
-        ~mask_reverse &
-        ~mask_equal_source &
-        mask_within_a_week &
-        mask_zero_sum_worth]
-    paired_df = paired_df.drop_duplicates(subset=['_id_open'])
-    paired_df = paired_df.drop_duplicates(subset=['_id_close'])
+    paired_df = _pair_transfers(help_df)
 
     # assign equal transaction IDs for entry pairs (choose first if possible, else one already hashed)
     paired_df['transaction_id'] = np.where(
@@ -232,28 +439,34 @@ def assign_transactions(df: DataFrame[MergedInputEntrySchema]) -> DataFrame[Merg
     df['transaction_id'] = indexed_df['transaction_id']
 
     # clean up
-    df = MergedInputEntrySchema.validate(df)
+    if validate:
+        df = MergedInputEntrySchema.validate(df)
 
     return df
 
 
-def hash_entries(df: DataFrame[MergedInputEntrySchema], forced_hash = False) -> DataFrame[MergedInputEntrySchema]:
-    # filter out columns not required for hashing
-    hashable_df = HashableEntrySchema.validate(df, lazy=True)
+def hash_entries(df: DataFrame[MergedInputEntrySchema], forced_hash = False, validate: bool = True) -> DataFrame[MergedInputEntrySchema]:
+    # only posted entries with all required values are hashed
+    columns = schema_columns(HashableEntrySchema)
+    mask_hashable = (df['status'] == 'posted') & df[required_columns(HashableEntrySchema)].notna().all(axis=1)
 
-    # compute hashes
-    hashable_df = hashable_df.copy()
-    hashable_df['hash'] = pd.util.hash_pandas_object(hashable_df, index=False).astype(str)  # without astype it's uint
+    # compute hashes; columns in schema order so hashes don't depend on the column order of entry files
+    hashes = pd.Series(pd.NA, index=df.index, dtype='UInt64')
+    hashes[mask_hashable] = hash_rows(df.loc[mask_hashable, columns])
 
     # verify input hashed entries have equal computed hashes
     if not forced_hash:
-        old_hashes_df = df[df['hash'].notna()].reset_index()
-        assert all(old_hashes_df['hash'].isin(hashable_df['hash']))
+        mask_hashed = df['hash'].notna()
+        mask_mismatched = mask_hashed & (hashes != df['hash']).fillna(True)
+        mismatched_accounts = df.loc[mask_mismatched, 'account_name'].unique()
+        assert not len(mismatched_accounts), \
+            f"Hashes don't match computed for accounts: {', '.join(mismatched_accounts)}"
 
     # set hashes to original df
-    df['hash'] = hashable_df['hash']
+    df['hash'] = hashes
 
     # clean up
-    df = MergedInputEntrySchema.validate(df)
+    if validate:
+        df = MergedInputEntrySchema.validate(df)
 
     return df
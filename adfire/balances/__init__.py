@@ -0,0 +1,18 @@
+from pathlib import Path
+
+from adfire.io import write_record
+from adfire.schema import AccountBalancesSchema
+
+
+def view(portfolio, output_dir: Path, args: list[str]):
+    df = portfolio.linted
+    last_df = df.groupby('account_name', observed=True).last()
+    last_df.index = last_df.index.astype(str)  # to add net worth, which is not an account
+
+    mask_is_credit = last_df['account_type'] == 'credit'
+    net_worth = last_df[~mask_is_credit]['balance_total'].sum() - last_df[mask_is_credit]['balance_total'].sum()
+    last_df = last_df[['balance_total']].rename(columns={'balance_total': 'balance'})
+    last_df.loc['Net Worth'] = net_worth.round(2)
+
+    last_df = AccountBalancesSchema.validate(last_df)
+    write_record(last_df, output_dir / 'balances.csv', index=True)
@@ -0,0 +1,196 @@
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from adfire.autofill import sort_entries, post_repeat_entries, fill_balances, assign_transactions, hash_entries
+from adfire.io import read_record, write_record
+from adfire.portfolio import Portfolio, _read_entry_files_from_dir
+from adfire.stages import run_stage
+
+MERCHANTS = ['Kroger', 'Uniqlo', 'UPS', 'Shell', 'Amazon', 'Costco', 'Starbucks', 'Target', 'Uber', 'Venmo Personal']
+SUBSCRIPTIONS = ['Spotify', 'Netflix', 'Gym', 'Rent', 'Payroll']
+CATEGORIES = [
+    'expenses.food.groceries.produce',
+    'expenses.food.groceries',
+    'expenses.food.restaurants',
+    'expenses.shopping.clothing',
+    'expenses.transport',
+    'expenses.housing.rent',
+    'income.salary',
+    'savings',
+]
+
+
+def _make_accounts(n: int) -> pd.DataFrame:
+    """Makes metadata of n accounts, alternating between checking and credit card accounts"""
+    is_credit = np.arange(n) % 2 == 1
+    return pd.DataFrame({
+        'account_name': [f'{"Credit" if credit else "Checking"} {i}' for i, credit in enumerate(is_credit)],
+        'account_mask': [f'{i:04d}' for i in range(n)],
+        'account_type': np.where(is_credit, 'credit', 'depository'),
+        'account_subtype': np.where(is_credit, 'credit card', 'checking'),
+        'balance_limit': np.where(is_credit, 10000.0, np.nan),
+    })
+
+
+def generate_portfolio(
+        path: os.PathLike,
+        accounts: int = 4,
+        years: int = 1,
+        entries_per_year: int = 250,
+        repeat_share: float = 0.1,
+        transfer_share: float = 0.1,
+        hashed_share: float = 0.0,
+        seed: int = 0
+):
+    """
+    Generates a synthetic portfolio in a directory, with one entry file per account
+    and year. Shares are the approximate shares of entries that are occurrences of
+    repeat rules, sides of transfers between accounts, and hashed (by formatting
+    the portfolio, then removing the hashes of the other entries). The same
+    arguments always generate the same portfolio, except for transaction IDs.
+    """
+    path = Path(path)
+    rng = np.random.default_rng(seed)
+    accounts_df = _make_accounts(accounts)
+    start = np.datetime64('2000-01-01')
+    days = 365 * years
+    n = entries_per_year * years
+
+    records = []
+    for account in accounts_df.itertuples(index=False):
+        n_repeats = round(n * repeat_share / (12 * years))
+        n_transfers = round(n * transfer_share / 2)
+        n_singles = max(n - n_repeats * 12 * years - n_transfers * 2, 1)
+
+        # single entries
+        singles = pd.DataFrame({
+            'date': start + rng.integers(0, days, n_singles).astype('timedelta64[D]'),
+            'amount': rng.integers(100, 20000, n_singles) / 100,
+            'entity': rng.choice(MERCHANTS, n_singles),
+            'category': rng.choice(CATEGORIES, n_singles),
+        })
+        if account.account_type == 'depository':
+            singles['amount'] = np.where(singles['category'] == 'income.salary', singles['amount'], -singles['amount'])
+
+        # repeat rules starting in the first month, posted up to the last single entry
+        repeats = pd.DataFrame({
+            'date': start + rng.integers(0, 28, n_repeats).astype('timedelta64[D]'),
+            'repeat': 'RRULE:FREQ=MONTHLY',
+            'amount': rng.integers(500, 5000, n_repeats) / 100,
+            'entity': rng.choice(SUBSCRIPTIONS, n_repeats),
+            'category': rng.choice(CATEGORIES, n_repeats),
+        })
+
+        records.append((account, pd.concat([singles, repeats], ignore_index=True)))
+
+    # transfers from checking accounts, the destination side posted up to 3 days later
+    transfers = {name: [] for name in accounts_df['account_name']}
+    if accounts > 1:
+        for i, (account, _) in enumerate(records):
+            if account.account_type != 'depository':
+                continue
+            n_transfers = round(n * transfer_share / 2)
+            targets = rng.choice([j for j in range(accounts) if j != i], n_transfers)
+            dates = start + rng.integers(0, days - 3, n_transfers).astype('timedelta64[D]')
+            amounts = rng.integers(1000, 100000, n_transfers) / 100
+            for j, date, amount in zip(targets, dates, amounts):
+                target = records[j][0]
+                target_amount = -amount if target.account_type == 'credit' else amount
+                transfers[account.account_name].append((date, -amount, target.account_name))
+                transfers[target.account_name].append((date + rng.integers(0, 4), target_amount, account.account_name))
+
+    # write one entry file per account and year
+    for account, df in records:
+        transfers_df = pd.DataFrame(transfers[account.account_name], columns=['date', 'amount', 'entity'])
+        transfers_df['category'] = 'savings'
+        df = pd.concat([df, transfers_df], ignore_index=True) if len(transfers_df) else df
+        df['date'] = pd.to_datetime(df['date'])
+        df = df.sort_values('date', kind='stable')
+        df['status'] = 'posted'
+        df['balance_limit'] = account.balance_limit
+        df['account_name'] = account.account_name
+        df['account_mask'] = account.account_mask
+        df['account_type'] = account.account_type
+        df['account_subtype'] = account.account_subtype
+        df = df[['date', 'status', 'repeat', 'amount', 'balance_limit', 'entity', 'account_name', 'account_mask',
+                 'account_type', 'account_subtype', 'category']]
+        for year, year_df in df.groupby(df['date'].dt.year):
+            year_df = year_df.assign(date=year_df['date'].dt.strftime('%Y-%m-%d'))
+            write_record(year_df, path / 'accounts' / account.account_name / f'{year}.csv')
+
+    with open(path / 'portfolio.json', 'w') as f:
+        json.dump({'name': 'Synthetic Portfolio'}, f)
+
+    if hashed_share > 0:
+        Portfolio(path).format()
+        shutil.rmtree(path / '.adfire')
+        for item in sorted((path / 'accounts').rglob('*.csv')):
+            df = read_record(item)
+            mask_unhashed = rng.random(len(df)) >= hashed_share
+            df.loc[mask_unhashed, 'hash'] = np.nan
+            write_record(df, item)
+
+
+def run_benchmarks(path: os.PathLike, rounds: int = 1, views: list[str] = None) -> pd.DataFrame:
+    """
+    Times each stage of linting, formatting and viewing a portfolio. The portfolio
+    is copied to a temporary directory first, so it is left unmodified.
+    """
+    views = ['adfire.balances', 'adfire.categories'] if views is None else views
+    results = []
+
+    def record(stage, func, *args, setup=None, **kwargs):
+        # call the stage a number of rounds, keep its last result and the fastest round; setup, if any, is called
+        # untimed before each round and returns the arguments of the stage
+        metrics = []
+        result = None
+        for _ in range(rounds):
+            if setup is not None:
+                args = setup()
+            result = run_stage(stage, func, *args, hooks=[metrics.append], **kwargs)
+        results.append(min(metrics, key=lambda m: m['seconds']))
+        return result
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+
+        def copy_portfolio():
+            shutil.copytree(path, tmp_path, dirs_exist_ok=True, ignore=shutil.ignore_patterns('.*'))
+            return ()
+
+        copy_portfolio()
+
+        # lint stages, each round starting from a copy of the results of the previous stage
+        df = record('read', _read_entry_files_from_dir, tmp_path)
+        df = record('sort_entries', sort_entries, df)
+        df = record('post_repeat_entries', post_repeat_entries, setup=lambda: (df.copy(),))
+        df = record('fill_balances', fill_balances, setup=lambda: (df.copy(),))
+        df = record('assign_transactions', assign_transactions, setup=lambda: (df.copy(),))
+        record('hash_entries', hash_entries, setup=lambda: (df.copy(),))
+
+        def lint(use_cache):
+            portfolio = Portfolio(tmp_path)
+            portfolio.use_cache = use_cache
+            return portfolio.lint()
+
+        record('lint', lint, use_cache=False)
+        lint(use_cache=True)
+        record('lint (cached)', lint, use_cache=True)
+        record('format', lambda: Portfolio(tmp_path).format(), setup=copy_portfolio)  # each round has files to write
+
+        record('linted (snapshot)', lambda: Portfolio(tmp_path).linted)
+        try:
+            os.chdir(tmp_path)  # views write reports relative to the working directory
+            for view in views:
+                record(f'view {view}', lambda v: Portfolio(tmp_path).view(v), view)
+        finally:
+            os.chdir(cwd)
+
+    return pd.DataFrame(results, columns=['stage', 'rows', 'seconds'])
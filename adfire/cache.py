@@ -0,0 +1,286 @@
+import datetime
+import json
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from pandera.typing import DataFrame
+
+from adfire.config import CACHE_DIRNAME, VALIDATION_LEVELS
+from adfire.io import checksum_record, read_checksum, write_checksum, read_snapshot, write_snapshot
+from adfire.schema import MergedInputEntrySchema, EntrySchema, schema_columns
+
+CHECKSUMS_FILENAME = 'checksums.pkl'
+LINTED_FILENAME = 'linted.pkl'
+CHECKPOINTS_FILENAME = 'checkpoints.pkl'
+METADATA_FILENAME = 'cache.json'
+SNAPSHOT_FILENAME = 'snapshot.npz'
+
+# entries are paired as transfers if they are less than a week apart
+_TRANSFER_WINDOW = pd.Timedelta(days=7)
+
+
+class LintCache:
+    """
+    Result of the last successful lint of a portfolio: the checksum of each
+    entry file at the time, the linted entries, balance checkpoints of their
+    accounts at the end of each month, if any, and the validation level they
+    were linted at.
+    """
+
+    def __init__(
+            self,
+            checksums: pd.Series,
+            linted: DataFrame[MergedInputEntrySchema],
+            checkpoints: Optional[pd.DataFrame] = None,
+            validation: str = 'full'
+    ):
+        self.checksums = checksums
+        self.linted = linted
+        self.checkpoints = checkpoints
+        self.validation = validation
+
+    def is_validated(self, validation: str) -> bool:
+        """Returns whether cached entries were validated at least as thoroughly as the given validation level"""
+        return _is_validated(self.validation, validation)
+
+    def get_changed_paths(self, checksums: pd.Series) -> set[str]:
+        """Returns paths of entry files that were added, removed or modified since the cache was written"""
+        old, new = self.checksums.align(checksums)
+        return set(old.index[old != new])
+
+    def get_settled_paths(self, checksums: pd.Series, since: datetime.date) -> set[str]:
+        """
+        Returns paths of entry files unchanged since the cache was written whose
+        entries are all dated up to the latest checkpoint before since. Their
+        cached entries may stand in for reading them, as if they were formatted.
+        """
+        if self.checkpoints is None:
+            return set()
+        dates = self.checkpoints.loc[self.checkpoints['date'] < since, 'date']
+        if dates.empty:
+            return set()
+        last_dates = self.linted['date'].groupby(self.linted.index.get_level_values('path')).max()
+        return set(last_dates.index[last_dates <= dates.max()]) - self.get_changed_paths(checksums)
+
+    def get_changed_accounts(self, df: DataFrame[MergedInputEntrySchema], checksums: pd.Series) -> set[str]:
+        """
+        Returns names of accounts with entries in changed entry files, both as they
+        are now and as they were when the cache was written.
+        """
+        changed_paths = self.get_changed_paths(checksums)
+        accounts = set()
+        for entries in [df, self.linted]:
+            mask_changed = entries.index.get_level_values('path').isin(changed_paths)
+            accounts.update(entries.loc[mask_changed, 'account_name'])
+        return accounts
+
+    def find_checkpoint(self, df: DataFrame[MergedInputEntrySchema], accounts: set[str]) -> Optional[datetime.date]:
+        """
+        Returns the latest month end that entries of the given accounts, as they
+        are now, can be linted again from with the checkpoints of that month: their
+        entries up to then are unchanged since the cache was written, none of them
+        repeat, and none can pair transfers with later entries. Returns None if
+        there is no such month.
+        """
+        if self.checkpoints is None:
+            return None
+        checkpoints = self.checkpoints[self.checkpoints['account_name'].isin(accounts)]
+        cached = self.linted[self.linted['account_name'].isin(accounts)]
+
+        # entries before a checkpoint are as they were, and their repeat entries aren't posted later
+        mask_usable = np.ones(len(checkpoints), dtype=bool)
+        dates = [_get_earliest_changed_date(df, cached), cached.loc[cached['repeat'].notna(), 'date'].min()]
+        for date in dates:
+            if not pd.isna(date):
+                mask_usable &= checkpoints['date'] < date
+        checkpoints = checkpoints[mask_usable]
+        if checkpoints.empty or not _match_checkpoints(cached, checkpoints):
+            return None
+
+        # entries of a transfer less than a week apart may pair, so there must be no checkpoint between them
+        starts, ends = _get_transfer_gaps(df, accounts)
+        for date in sorted(set(checkpoints['date']), reverse=True):
+            if not ((starts <= date) & (date < ends)).any():
+                return date
+        return None
+
+    def get_openings(self, date: datetime.date, accounts: set[str]) -> pd.DataFrame:
+        """Returns the latest checkpoint of each of the given accounts up to a month end, indexed by account"""
+        mask = self.checkpoints['account_name'].isin(accounts) & (self.checkpoints['date'] <= date)
+        return self.checkpoints[mask].drop_duplicates('account_name', keep='last').set_index('account_name')
+
+
+def _is_validated(level: str, validation: str) -> bool:
+    """Returns whether a validation level is at least as thorough as the given one"""
+    return VALIDATION_LEVELS.index(level) <= VALIDATION_LEVELS.index(validation)
+
+
+def _month_ends(dates: pd.Series) -> pd.Series:
+    return (pd.to_datetime(dates) + pd.offsets.MonthEnd(0)).dt.date
+
+
+def _get_earliest_changed_date(df: DataFrame[MergedInputEntrySchema], cached: DataFrame[MergedInputEntrySchema]):
+    """
+    Returns the earliest date of entries that are added, removed or modified
+    compared to cached entries, or NaN if there are none. Entries without
+    filled values, like entries of unformatted files, are modified.
+    """
+    current, previous = df.align(cached, join='outer', axis=0)
+    mask_changed = np.zeros(len(current), dtype=bool)
+    for column in schema_columns(EntrySchema):
+        # categories of both may differ, so values are compared as objects
+        values = current[column].to_numpy(dtype=object)
+        cached_values = previous[column].to_numpy(dtype=object)
+        mask_missing = pd.isna(values)
+        mask_cached_missing = pd.isna(cached_values)
+        mask_both = ~mask_missing & ~mask_cached_missing
+        mask_equal = mask_missing & mask_cached_missing
+        mask_equal[mask_both] = values[mask_both] == cached_values[mask_both]
+        mask_changed |= ~mask_equal
+
+    dates = pd.concat([current.loc[mask_changed, 'date'], previous.loc[mask_changed, 'date']])
+    return dates.dropna().min()
+
+
+def _match_checkpoints(cached: DataFrame[MergedInputEntrySchema], checkpoints: pd.DataFrame) -> bool:
+    """Returns whether checkpoints are of the last cached entries of each account and month, up to the last checkpoint"""
+    columns = ['balance_current', 'balance_total', 'balance_available', 'hash']
+    last = cached[columns].assign(
+        date=_month_ends(cached['date']).to_numpy(),
+        account_name=cached['account_name'].astype(object).to_numpy()
+    )
+    last = last.drop_duplicates(['date', 'account_name'], keep='last')
+    last = last[last['date'] <= checkpoints['date'].max()]
+
+    merged = last.merge(
+        checkpoints[['date', 'account_name', *columns]],
+        on=['date', 'account_name'],
+        how='outer',
+        suffixes=('', '_checkpoint'),
+        indicator=True
+    )
+    if (merged['_merge'] != 'both').any():
+        return False
+    for column in columns:
+        values, checkpoint_values = merged[column], merged[f'{column}_checkpoint']
+        mask_equal = (values == checkpoint_values).fillna(False) | (values.isna() & checkpoint_values.isna())
+        if not mask_equal.all():
+            return False
+    return True
+
+
+def _get_transfer_gaps(df: DataFrame[MergedInputEntrySchema], accounts: set[str]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns dates of consecutive entries between the given accounts less than a
+    week apart with the same absolute amount, which may pair as a transfer.
+    """
+    mask = df['account_name'].isin(accounts) & df['entity'].isin(accounts)
+    if not mask.any():
+        return np.array([]), np.array([])
+    names = df.loc[mask, 'account_name'].astype(str)
+    entities = df.loc[mask, 'entity'].astype(str)
+    transfers = pd.DataFrame({
+        'first': names.where(names < entities, entities),
+        'second': entities.where(names < entities, names),
+        'amount': df.loc[mask, 'amount'].abs(),
+        'date': pd.to_datetime(df.loc[mask, 'date']),
+    })
+    keys = ['first', 'second', 'amount']
+    transfers = transfers.sort_values(by=[*keys, 'date'])
+
+    mask_same = (transfers[keys] == transfers[keys].shift()).all(axis=1)
+    starts = transfers['date'].shift()[mask_same]
+    ends = transfers['date'][mask_same]
+    mask_near = (ends - starts) < _TRANSFER_WINDOW
+    return starts[mask_near].dt.date.to_numpy(), ends[mask_near].dt.date.to_numpy()
+
+
+def get_linked_accounts(df: DataFrame[MergedInputEntrySchema], accounts: set[str]) -> set[str]:
+    """Returns names of accounts that may pair transactions with any of the given accounts"""
+    names = set(df['account_name'])
+    mask_from = df['account_name'].isin(accounts) & df['entity'].isin(names)
+    mask_to = df['entity'].isin(accounts)
+    return (set(df.loc[mask_from, 'entity']) | set(df.loc[mask_to, 'account_name'])) - accounts
+
+
+def read_cache(path: Path) -> Optional[LintCache]:
+    """Reads the lint cache of a portfolio, if any"""
+    cache_path = path / CACHE_DIRNAME
+    try:
+        checksums = read_checksum(cache_path / CHECKSUMS_FILENAME)
+        linted = pd.read_pickle(cache_path / LINTED_FILENAME)
+        with open(cache_path / METADATA_FILENAME) as f:
+            metadata = json.load(f)
+    except FileNotFoundError:  # or written by an earlier version, which didn't record its validation level
+        return None
+    try:
+        checkpoints = pd.read_pickle(cache_path / CHECKPOINTS_FILENAME)
+    except FileNotFoundError:  # written by an earlier version
+        checkpoints = None
+    return LintCache(checksums, linted, checkpoints, validation=metadata['validation'])
+
+
+def write_cache(path: Path, cache: LintCache):
+    """Writes the lint cache of a portfolio"""
+    cache_path = path / CACHE_DIRNAME
+    cache_path.mkdir(exist_ok=True)
+    cache.linted.to_pickle(cache_path / LINTED_FILENAME)
+    if cache.checkpoints is not None:
+        cache.checkpoints.to_pickle(cache_path / CHECKPOINTS_FILENAME)
+    else:
+        (cache_path / CHECKPOINTS_FILENAME).unlink(missing_ok=True)
+    write_checksum(cache.checksums, cache_path / CHECKSUMS_FILENAME)
+    with open(cache_path / METADATA_FILENAME, 'w') as f:
+        json.dump({'validation': cache.validation}, f)
+
+
+def _checksum_entry_files(items: list[Path]) -> dict[str, np.ndarray]:
+    """Returns sha256 checksums of entry files as arrays of paths and checksums, like the lint cache stores"""
+    return {
+        'paths': np.asarray([str(item) for item in items], dtype=str),
+        'checksums': np.asarray([checksum_record(item) for item in items], dtype=str),
+    }
+
+
+def read_portfolio_snapshot(
+        path: Path,
+        items: list[Path],
+        validation: str = 'full'
+) -> Optional[DataFrame[MergedInputEntrySchema]]:
+    """
+    Reads the snapshot of formatted entries of a portfolio, if any, entry files
+    were not added, removed or modified since it was written, and its entries
+    were validated at least as thoroughly as the given validation level.
+    """
+    try:
+        df, arrays = read_snapshot(path / CACHE_DIRNAME / SNAPSHOT_FILENAME)
+    except FileNotFoundError:
+        return None
+
+    if 'validation' not in arrays or not _is_validated(str(arrays['validation']), validation):
+        return None
+
+    # content is compared, as a same-size edit may keep the modification time within its granularity
+    checksums = _checksum_entry_files(items)
+    for name, values in checksums.items():
+        if name not in arrays or not np.array_equal(arrays[name], values):
+            return None
+
+    return df
+
+
+def write_portfolio_snapshot(
+        path: Path,
+        df: DataFrame[MergedInputEntrySchema],
+        items: list[Path],
+        validation: str = 'full'
+):
+    """
+    Writes a snapshot of formatted entries, along with the state of entry files
+    they were written to and the validation level they were linted at.
+    """
+    cache_path = path / CACHE_DIRNAME
+    cache_path.mkdir(exist_ok=True)
+    write_snapshot(df, cache_path / SNAPSHOT_FILENAME, validation=np.asarray(validation), **_checksum_entry_files(items))
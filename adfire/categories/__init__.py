@@ -0,0 +1,97 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from adfire.charts import CHART_FORMATS, render_charts
+from adfire.io import write_record
+from adfire.utils import get_worths
+
+
+def sign(s: pd.Series) -> pd.Series:
+    supercat = s.name.split('.')[0]
+    return (-s if supercat in ['expenses', 'savings'] else s).replace(-0, 0)
+
+
+def generate_descendants(category):
+    if category is np.nan:
+        return None
+    parts = category.split('.')
+    return ['.'.join(parts[:i + 1]) for i in range(len(parts))]
+
+
+def roll_up(df: pd.DataFrame, categories: list[str]) -> pd.DataFrame:
+    """
+    Totals of categories from totals of leaf categories in columns, each category
+    summing itself and its descendants. Parents of the distinct leaf categories
+    are indexed once, so cost doesn't grow with the number of entries.
+    """
+    parents = pd.DataFrame(
+        [(leaf, parent) for leaf in df.columns for parent in generate_descendants(leaf)],
+        columns=['leaf', 'category']
+    )
+    indicator = pd.crosstab(parents['leaf'], parents['category'])
+    indicator = indicator.reindex(index=df.columns, columns=categories, fill_value=0)
+    return df @ indicator
+
+
+def categorize_by_year_month(df: pd.DataFrame, categories: list[str] = None) -> pd.DataFrame:
+    df = df[df['category'].notna()]
+    dates = pd.to_datetime(df['date'])
+    defined_categories = df['category'].unique().tolist()
+
+    # totals of leaf categories by month, then rolled up the category tree
+    worths = pd.Series(get_worths(df), index=df.index)
+    leaf_df = worths.groupby([dates.dt.year.rename('year'), dates.dt.month.rename('month'), df['category']],
+                             observed=True).sum()
+    leaf_df = leaf_df.unstack('category', fill_value=0)
+    df = roll_up(leaf_df, categories if categories else defined_categories)
+
+    df = df.sort_index()
+    df = df.apply(sign)
+
+    return df
+
+
+def write_table(df: pd.DataFrame, path: Path) -> None:
+    yearly_df = df.groupby(level='year').sum().reset_index()
+    yearly_df['month'] = None
+    yearly_df = yearly_df.set_index(['year', 'month'])
+
+    all_df = df.sum().to_frame().T
+    all_df['year'] = None
+    all_df['month'] = None
+    all_df = all_df.set_index(['year', 'month'])
+
+    df = pd.concat([df, yearly_df, all_df])
+    df = df.sort_index()
+    df = df.round(2)
+    write_record(df, path, index=True)
+
+
+def to_monthly_series(df: pd.DataFrame) -> pd.DataFrame:
+    """Indexes totals of categories by the first day of their month, to plot over time"""
+    index = pd.to_datetime(pd.DataFrame({'year': df.index.get_level_values('year'),
+                                         'month': df.index.get_level_values('month'), 'day': 1}))
+    return df.set_axis(index, axis=0)
+
+
+def view(portfolio, output_dir: Path, args: list[str]):
+    parser = argparse.ArgumentParser(prog='adfire view categories')
+    parser.add_argument('categories', help='categories to report, default to all used', nargs='*')
+    parser.add_argument('--format', help='format of charts, default to png', choices=CHART_FORMATS, default='png')
+    args = parser.parse_args(args)
+
+    df = portfolio.linted
+    df = categorize_by_year_month(df, categories=args.categories)
+
+    write_table(df, output_dir / 'categories.csv')
+    series_df = to_monthly_series(df)
+    chart = {'xlabel': 'Year-Month', 'ylabel': 'Amount', 'legend_title': 'Categories'}
+    render_charts([
+        {**chart, 'df': series_df, 'title': 'Trends of Categories Over Time',
+         'path': output_dir / f'trends.{args.format}'},
+        {**chart, 'df': series_df.cumsum(), 'title': 'Cumulative Amount of Categories Over Time',
+         'path': output_dir / f'cumsum.{args.format}'},
+    ], jobs=portfolio.jobs)
@@ -0,0 +1,94 @@
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+# charts are written as images, or as JSON series of their lines for dashboards
+CHART_FORMATS = ['png', 'svg', 'json']
+
+_local = threading.local()  # each thread plotting charts reuses its own figure
+
+
+def _get_figure():
+    """Returns the cleared figure of this thread, creating it on an Agg canvas on first use"""
+    if getattr(_local, 'figure', None) is None:
+        # no pyplot, so no GUI backend or global state is loaded
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        _local.figure = Figure(figsize=(10, 6))
+        FigureCanvasAgg(_local.figure)
+    _local.figure.clear()
+    return _local.figure
+
+
+def write_series(df: pd.DataFrame, title: str, path: os.PathLike) -> None:
+    """Writes lines of a chart to a JSON file: its title, the x values, and y values of each line"""
+    data = {
+        'title': title,
+        'x': df.index.astype(str).tolist(),
+        'series': {str(name): ser.tolist() for name, ser in df.items()},
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+
+def plot_lines(
+        df: pd.DataFrame,
+        title: str,
+        path: os.PathLike,
+        xlabel: str = '',
+        ylabel: str = '',
+        legend_title: str = ''
+) -> None:
+    """
+    Plots each column of a dataframe as a line over its index, with lines in the
+    legend ordered by their last values. Written as PNG, SVG or JSON series by
+    the extension of the path.
+    """
+    if Path(path).suffix == '.json':
+        write_series(df, title, path)
+        return
+
+    fig = _get_figure()
+    ax = fig.add_subplot()
+    lines = ax.plot(df.index, df.to_numpy(), marker='o')  # all lines at once
+    for line, name in zip(lines, df.columns):
+        line.set_label(str(name))
+
+    # legend by final y-values in descending order
+    last_values = df.iloc[-1].tolist() if len(df) else [0] * len(lines)
+    sorted_lines = [line for _, line in sorted(zip(last_values, lines), key=lambda item: item[0], reverse=True)]
+    ax.legend(sorted_lines, [line.get_label() for line in sorted_lines], title=legend_title, fontsize=8)
+
+    ax.set_title(title, fontsize=16)
+    ax.set_xlabel(xlabel, fontsize=14)
+    ax.set_ylabel(ylabel, fontsize=14)
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.grid(visible=True)
+
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def render_charts(charts: list[dict], jobs: int = 1) -> None:
+    """
+    Plots charts, each given by keyword arguments of plot_lines. If jobs is more
+    than 1, charts are plotted concurrently by that many processes. Processes are
+    spawned rather than forked, as views may call this from threads of view_all.
+    """
+    if jobs > 1 and len(charts) > 1:
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(jobs, len(charts)), mp_context=context) as executor:
+            list(executor.map(_plot_chart, charts))  # raises errors of any chart
+    else:
+        for chart in charts:
+            _plot_chart(chart)
+
+
+def _plot_chart(chart: dict) -> None:
+    plot_lines(**chart)
@@ -1,3 +1,37 @@
 import importlib.resources
+import os
+import shutil
+from pathlib import Path
 
-RESOURCES_PATH = importlib.resources.files('adfire.resources')
\ No newline at end of file
+RESOURCES_PATH = importlib.resources.files('adfire.resources')
+
+CACHE_DIRNAME = '.adfire'
+
+VALIDATION_LEVELS = ['full', 'boundary', 'off']
+
+
+def init_portfolio_dir(path: os.PathLike):
+    """
+    Defines directory as a portfolio. If 'portfolio.json' exists, raises an error.
+    Otherwise, if directory is empty, populate with sample portfolio; if not empty,
+    create 'portfolio.json' from sample.
+    """
+    path = Path(path)
+    metadata_path = path / 'portfolio.json'
+    metadata_file_exists = metadata_path.is_file()
+
+    if metadata_file_exists:
+        raise FileExistsError(f"'{metadata_path}' already exists")
+
+    dir_is_empty = path.exists() and path.is_dir() and not any(path.iterdir())
+
+    if not dir_is_empty:
+        sample_file_path = RESOURCES_PATH / 'sample/portfolio.json'
+        shutil.copyfile(sample_file_path, metadata_path)
+    else:
+        sample_path = RESOURCES_PATH / 'sample'
+        shutil.copytree(
+            sample_path,
+            path,
+            dirs_exist_ok=True  # because we already know it's empty
+        )
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+# Hashes are computed like pd.util.hash_pandas_object(df, index=False) with its default key, so hashes already
+# in entry files stay valid, but without depending on pandas: strings are hashed with SipHash-2-4, numbers by
+# their bits, then mixed and combined column by column.
+HASH_KEY = b'0123456789123456'
+
+_MISSING_HASH = np.uint64(np.iinfo(np.uint64).max)
+
+
+def _rotl(x: np.ndarray, b: int) -> np.ndarray:
+    return (x << np.uint64(b)) | (x >> np.uint64(64 - b))
+
+
+def _sipround(v0, v1, v2, v3):
+    v0 = v0 + v1
+    v1 = _rotl(v1, 13) ^ v0
+    v0 = _rotl(v0, 32)
+    v2 = v2 + v3
+    v3 = _rotl(v3, 16) ^ v2
+    v0 = v0 + v3
+    v3 = _rotl(v3, 21) ^ v0
+    v2 = v2 + v1
+    v1 = _rotl(v1, 17) ^ v2
+    v2 = _rotl(v2, 32)
+    return v0, v1, v2, v3
+
+
+def siphash(values: list[bytes], key: bytes = HASH_KEY) -> np.ndarray:
+    """Computes SipHash-2-4 digests of byte strings, all strings at once"""
+    n = len(values)
+    lengths = np.array([len(value) for value in values], dtype=np.int64)
+    n_words = lengths // 8 + 1  # the last word holds the remaining bytes and the length
+
+    # lay out bytes of each string in a row of little-endian words, padded with zeros
+    width = int(n_words.max(initial=1))
+    buffer = np.zeros((n, width * 8), dtype=np.uint8)
+    rows = np.repeat(np.arange(n), lengths)
+    columns = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    buffer[rows, columns] = np.frombuffer(b''.join(values), dtype=np.uint8)
+    buffer[np.arange(n), n_words * 8 - 1] = lengths & 0xff
+    words = buffer.view('<u8').astype(np.uint64)
+
+    k0, k1 = np.frombuffer(key, dtype='<u8').astype(np.uint64)
+    v0 = np.full(n, k0 ^ np.uint64(0x736f6d6570736575))
+    v1 = np.full(n, k1 ^ np.uint64(0x646f72616e646f6d))
+    v2 = np.full(n, k0 ^ np.uint64(0x6c7967656e657261))
+    v3 = np.full(n, k1 ^ np.uint64(0x7465646279746573))
+
+    # compress words, leaving strings that ran out of words unchanged
+    for i in range(width):
+        m = words[:, i]
+        u0, u1, u2, u3 = _sipround(*_sipround(v0, v1, v2, v3 ^ m))
+        active = i < n_words
+        v0 = np.where(active, u0 ^ m, v0)
+        v1 = np.where(active, u1, v1)
+        v2 = np.where(active, u2, v2)
+        v3 = np.where(active, u3, v3)
+
+    # finalize
+    v2 = v2 ^ np.uint64(0xff)
+    for _ in range(4):
+        v0, v1, v2, v3 = _sipround(v0, v1, v2, v3)
+    return v0 ^ v1 ^ v2 ^ v3
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """Redistributes 64-bit hashes within the space of 64-bit ints"""
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xbf58476d1ce4e5b9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94d049bb133111eb)
+    values = values ^ (values >> np.uint64(31))
+    return values
+
+
+def _hash_column(ser: pd.Series) -> np.ndarray:
+    """Hashes values of a column; numbers by their bits, other values by their distinct strings"""
+    if ser.dtype.kind in 'iuf':
+        values = ser.to_numpy()
+        return _mix(values.view(f'u{values.dtype.itemsize}').astype(np.uint64))
+
+    if isinstance(ser.dtype, pd.CategoricalDtype):
+        codes, categories = ser.cat.codes.to_numpy(), ser.cat.categories
+    else:
+        codes, categories = pd.factorize(ser)
+    strings = [(value if isinstance(value, str) else str(value)).encode('utf8') for value in categories]
+    hashes = _mix(siphash(strings))
+    return np.where(codes >= 0, hashes[codes] if len(hashes) else _MISSING_HASH, _MISSING_HASH)
+
+
+def hash_rows(df: pd.DataFrame) -> np.ndarray:
+    """Hashes each row of a dataframe, combining hashes of its columns in order"""
+    out = np.full(len(df), np.uint64(0x345678))
+    mult = np.uint64(1000003)
+    for i, (_, ser) in enumerate(df.items()):
+        out = (out ^ _hash_column(ser)) * mult
+        mult += np.uint64(82520 + 2 * (len(df.columns) - i))
+    return out + np.uint64(97531)
@@ -1,5 +1,9 @@
+import datetime
+import hashlib
 import os
+import shutil
 
+import numpy as np
 import pandas as pd
 
 
@@ -11,10 +15,46 @@ def read_record(path) -> pd.DataFrame:
 def write_record(df, path, index: bool = False):
     dirname = os.path.dirname(path)
     if dirname and not os.path.exists(dirname):
-        os.mkdir(dirname)
+        os.makedirs(dirname)
     df.to_csv(path, index=index)
 
 
+def write_record_if_changed(df, path, index: bool = False) -> bool:
+    """
+    Writes a dataframe like write_record, but only if it differs from the content
+    of the file. The file is replaced atomically with a temporary file, so it is
+    never left partially written. Returns whether the file was written.
+    """
+    content = df.to_csv(index=index).encode()
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+
+    dirname = os.path.dirname(path)
+    if dirname and not os.path.exists(dirname):
+        os.makedirs(dirname)
+    tmp_path = os.path.join(dirname, f'.{os.path.basename(path)}.{os.getpid()}.tmp')  # hidden until replaced
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
+
+
+def checksum_record(path) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
 def read_checksum(path) -> pd.Series:
     ser = pd.read_pickle(path)
     return ser
@@ -22,3 +62,61 @@ def read_checksum(path) -> pd.Series:
 
 def write_checksum(hash, path):
     hash.to_pickle(path)
+
+
+def write_snapshot(df: pd.DataFrame, path, **arrays):
+    """
+    Writes a dataframe to a NumPy '.npz' file column by column. Numeric columns
+    are stored as is, nullable integer columns with a mask of missing values,
+    date columns as datetime64, and categorical and other object columns as codes
+    into their categories. Extra arrays are stored alongside, prefixed with '_'.
+    """
+    data = {'_index': np.asarray(df.index.names, dtype=str)}
+    df = df.reset_index()
+    data['_columns'] = np.asarray(df.columns, dtype=str)
+    for name, ser in df.items():
+        values = ser.dropna()
+        if isinstance(ser.dtype, pd.CategoricalDtype):
+            data[f'{name}.category_codes'] = ser.cat.codes.to_numpy(dtype=np.int32)
+            data[f'{name}.categories'] = np.asarray(ser.cat.categories, dtype=str)
+        elif isinstance(ser.dtype, pd.api.extensions.ExtensionDtype) and ser.dtype.kind in 'iu':  # nullable integers
+            data[f'{name}.masked'] = ser.to_numpy(dtype=ser.dtype.numpy_dtype, na_value=0)
+            data[f'{name}.mask'] = ser.isna().to_numpy()
+        elif ser.dtype != object:
+            data[f'{name}.values'] = ser.to_numpy()
+        elif len(values) and isinstance(values.iloc[0], datetime.date):
+            data[f'{name}.dates'] = ser.to_numpy(dtype='datetime64[D]')
+        else:
+            codes, categories = pd.factorize(ser)
+            data[f'{name}.codes'] = codes.astype(np.int32)
+            data[f'{name}.categories'] = np.asarray(categories, dtype=str)
+    data.update({f'_{name}': value for name, value in arrays.items()})
+    np.savez(path, **data)
+
+
+def read_snapshot(path) -> tuple[pd.DataFrame, dict[str, np.ndarray]]:
+    """Reads a dataframe and the extra arrays written by write_snapshot"""
+    with np.load(path, allow_pickle=False) as npz:
+        data = dict(npz)
+
+    columns = {}
+    for name in data.pop('_columns'):
+        if f'{name}.values' in data:
+            columns[name] = data.pop(f'{name}.values')
+        elif f'{name}.masked' in data:
+            columns[name] = pd.arrays.IntegerArray(data.pop(f'{name}.masked'), data.pop(f'{name}.mask'))
+        elif f'{name}.dates' in data:
+            columns[name] = pd.Series(data.pop(f'{name}.dates')).dt.date
+        elif f'{name}.category_codes' in data:
+            codes = data.pop(f'{name}.category_codes')
+            categories = data.pop(f'{name}.categories').tolist()
+            columns[name] = pd.Categorical.from_codes(codes, categories)
+        else:
+            codes = data.pop(f'{name}.codes')
+            categories = data.pop(f'{name}.categories').tolist()
+            columns[name] = pd.Categorical.from_codes(codes, categories).astype(object)
+    df = pd.DataFrame(columns)
+    df = df.set_index(data.pop('_index').tolist())
+
+    arrays = {name.removeprefix('_'): value for name, value in data.items()}
+    return df, arrays
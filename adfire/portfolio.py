@@ -1,20 +1,36 @@
+import datetime
 import json
 import os
 import runpy
-import shutil
+import importlib
 import importlib.util
 import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import cached_property
 from pathlib import Path
 from types import SimpleNamespace
+from typing import Iterable, Iterator, Optional, Union
 
 import pandas as pd
+from pandas.api.types import union_categoricals
 from pandera.typing import DataFrame
 
-from adfire.autofill import assign_transactions, hash_entries, sort_entries, fill_current_balances, \
-    fill_available_balances, fill_total_balances, post_repeat_entries
-from adfire.config import RESOURCES_PATH
-from adfire.io import read_record, write_record
-from adfire.schema import MergedInputEntrySchema, EntrySchema
+from adfire.autofill import assign_transactions, hash_entries, sort_entries, fill_balances, post_repeat_entries, \
+    balance_checkpoints
+from adfire.cache import LintCache, read_cache, write_cache, get_linked_accounts, read_portfolio_snapshot, \
+    write_portfolio_snapshot
+from adfire.config import VALIDATION_LEVELS, init_portfolio_dir
+from adfire.io import read_record, write_record_if_changed, checksum_record
+from adfire.schema import MergedInputEntrySchema, EntrySchema, InputEntrySchema, categorical_columns, \
+    schema_columns
+from adfire.stages import StageHook, run_stage
+
+
+# columns of entries needed to pair transfers
+_TRANSFER_COLUMNS = ['date', 'amount', 'entity', 'account_name', 'account_type', 'transaction_id', 'hash']
 
 
 def _read_metadata_from_dir(path: Path) -> SimpleNamespace:
@@ -29,39 +45,465 @@ def _read_metadata_from_dir(path: Path) -> SimpleNamespace:
         return metadata
 
 
-def _read_entry_files_from_dir(path: Path) -> DataFrame[MergedInputEntrySchema]:
-    """Reads all entry files in a directory and merge them into a dataframe"""
-    records = []
+def _find_entry_files_in_dir(path: Path) -> list[Path]:
+    """Finds all entry files in a directory"""
+    items = []
     for item in path.rglob('*.csv'):
         # Skip files and directories that are hidden (start with a '.')
         if any(part.startswith('.') for part in item.parts):
             continue
         item = item.resolve()
         if item.is_file():
-            df = read_record(item)
-            records.append((item, df))
+            items.append(item)
+    return items
+
+
+def _read_entry_file(path: Path) -> DataFrame[InputEntrySchema]:
+    """Reads an entry file and validates its entries"""
+    df = read_record(path)
+    df = InputEntrySchema.validate(df)
+    return df
+
+
+def _read_entry_files_from_dir(
+        path: Path,
+        jobs: int = 1,
+        cached: Optional[DataFrame[MergedInputEntrySchema]] = None
+) -> DataFrame[MergedInputEntrySchema]:
+    """
+    Reads all entry files in a directory and merge them into a dataframe. If jobs
+    is more than 1, files are read and validated concurrently by that many threads.
+    Entries of files in cached entries, if given, are taken from them instead.
+    """
+    return _read_entry_files(_find_entry_files_in_dir(path), jobs=jobs, cached=cached)
+
+
+def _read_account_entry_files_from_dir(
+        path: Path,
+        accounts: set[str],
+        jobs: int = 1,
+        cached: Optional[DataFrame[MergedInputEntrySchema]] = None
+) -> DataFrame[MergedInputEntrySchema]:
+    """
+    Reads entry files in a directory with entries of the given accounts, or of
+    accounts that may pair transactions with them, and merges entries of those
+    accounts into a dataframe. Of other entry files, only account columns are read.
+    Entries of files in cached entries, if given, are taken from them instead.
+    """
+    items = _find_entry_files_in_dir(path)
+    cached_dfs = _split_entries_by_path(cached)
+    names = [
+        cached_dfs[str(item)][['account_name', 'entity']].astype(object) if str(item) in cached_dfs else
+        pd.read_csv(item, usecols=lambda name: name in ['account_name', 'entity'], dtype=str)
+        .reindex(columns=['account_name', 'entity'])
+        for item in items
+    ]
+    names_df = pd.concat(names) if names else pd.DataFrame(columns=['account_name', 'entity'])
+    missing = accounts - set(names_df['account_name'])
+    if missing:
+        raise ValueError(f"Accounts not found: {', '.join(sorted(missing))}")
+
+    scope = accounts | get_linked_accounts(names_df, accounts)
+    items = [item for item, df in zip(items, names) if df['account_name'].isin(scope).any()]
+    df = _read_entry_files(items, jobs=jobs, cached=cached)
+    return df[df['account_name'].isin(scope)]
+
+
+def _filter_entries(
+        df: DataFrame[MergedInputEntrySchema],
+        accounts: Optional[set[str]] = None,
+        since: Optional[datetime.date] = None,
+        until: Optional[datetime.date] = None
+) -> DataFrame[MergedInputEntrySchema]:
+    """Selects entries of the given accounts dated from since to until, both inclusive"""
+    mask = pd.Series(True, index=df.index)
+    if accounts is not None:
+        mask &= df['account_name'].isin(accounts)
+    dates = pd.to_datetime(df['date'])
+    if since is not None:
+        mask &= dates >= pd.Timestamp(since)
+    if until is not None:
+        mask &= dates <= pd.Timestamp(until)
+    return df[mask]
+
+
+def _split_entries_by_path(df: Optional[DataFrame[MergedInputEntrySchema]]) -> dict[str, pd.DataFrame]:
+    """Returns entries of each entry file, indexed by entry ID, by path"""
+    if df is None:
+        return {}
+    return {path: group.droplevel('path') for path, group in df.groupby(level='path', sort=False)}
+
+
+def _read_entry_files(
+        items: list[Path],
+        jobs: int = 1,
+        cached: Optional[DataFrame[MergedInputEntrySchema]] = None
+) -> DataFrame[MergedInputEntrySchema]:
+    """
+    Reads entry files and merge them into a dataframe, by the given number of
+    threads. Entries of files in cached entries, if given, are taken from them
+    instead of read, in the order of items.
+    """
+    cached_dfs = _split_entries_by_path(cached)
+    read_items = [item for item in items if str(item) not in cached_dfs]
+    if jobs > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            read_records = list(executor.map(_read_entry_file, read_items))  # map keeps the order of items
+    else:
+        read_records = [_read_entry_file(item) for item in read_items]
+    read_records = iter(read_records)
+    records = [cached_dfs[str(item)] if str(item) in cached_dfs else next(read_records) for item in items]
 
     if records:
-        df = pd.concat([df for name, df in records], keys=[name for name, df in records], names=['path', 'entry_id'])
-        df = MergedInputEntrySchema.validate(df)
+        df = _concat_entries(records, keys=[str(item) for item in items], names=['path', 'entry_id'])
     else:
         df = None
 
     return df
 
 
+def _compact_entries(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts low-cardinality columns to categoricals, as concatenating entries
+    with different categories falls back to strings.
+    """
+    return df.astype({name: 'category' for name in categorical_columns(MergedInputEntrySchema) if name in df})
+
+
+def _concat_entries(dfs: list[pd.DataFrame], **kwargs) -> pd.DataFrame:
+    """Concatenates entries, unifying categories first so low-cardinality columns stay categorical"""
+    dtypes = {}
+    for name in categorical_columns(MergedInputEntrySchema):
+        columns = [df[name] for df in dfs if name in df]
+        if columns and all(isinstance(column.dtype, pd.CategoricalDtype) for column in columns):
+            dtypes[name] = pd.CategoricalDtype(union_categoricals(columns).categories)
+    dfs = [df.astype({name: dtype for name, dtype in dtypes.items() if name in df}) for df in dfs]
+    return _compact_entries(pd.concat(dfs, **kwargs))
+
+
+def _stat_entry_files_in_dir(path: Path) -> dict[str, tuple[int, int]]:
+    """Returns the modification time and size of all entry files in a directory, by path"""
+    stats = {}
+    for item in _find_entry_files_in_dir(path):
+        try:
+            stat = item.stat()
+        except FileNotFoundError:
+            continue  # removed since found
+        stats[str(item)] = (stat.st_mtime_ns, stat.st_size)
+    return stats
+
+
+def _read_checksums_from_dir(path: Path) -> pd.Series:
+    """Computes checksums of all entry files in a directory, indexed by path"""
+    items = _find_entry_files_in_dir(path)
+    return pd.Series([checksum_record(item) for item in items], index=[str(item) for item in items], dtype=str)
+
+
+def _finalize_entries(df: pd.DataFrame, validate: bool = True) -> DataFrame[MergedInputEntrySchema]:
+    """Rounds numbers to cents and selects columns of the final schema"""
+    df = df.round(2)
+    df = df.replace(-0.0, 0.0)
+    df = _compact_entries(df)
+    if validate:
+        df = MergedInputEntrySchema.validate(df)
+    df = df[schema_columns(MergedInputEntrySchema)]
+    return df
+
+
+def _lint_entries(
+        df: DataFrame[MergedInputEntrySchema],
+        forced_hash: bool = False,
+        validation: str = 'full',
+        hooks: Iterable[StageHook] = (),
+        jobs: int = 1,
+        openings: Optional[pd.DataFrame] = None
+) -> DataFrame[MergedInputEntrySchema]:
+    """
+    Runs the autofill pipeline on merged entries. Stages validate their results
+    only if validation is 'full', otherwise they trust typed entries. Hooks are
+    called with metrics of each stage. If jobs is more than 1, stages that are
+    independent per account run across that many processes. If openings are
+    given, balances of their accounts resume from those checkpoints.
+    """
+    validate = validation == 'full'
+    if jobs > 1 and openings is None:
+        # post occurrences of recurring entries and autofill balances, per account in parallel
+        fill_stages = [('fill_entries_in_parallel', _fill_entries_in_parallel, {'validate': validate, 'jobs': jobs})]
+    else:
+        fill_stages = [
+            # post occurrences of recurring entries
+            ('post_repeat_entries', post_repeat_entries, {'validate': validate}),
+            # autofill balances
+            ('fill_balances', fill_balances, {'validate': validate, 'openings': openings}),
+        ]
+    stages = [
+        # following computations require df to be sorted already
+        ('sort_entries', sort_entries, {}),
+        *fill_stages,
+        # assign ids (include pairing)
+        ('assign_transactions', assign_transactions, {'validate': validate}),
+        # assign hashes (depends on order of entries in the account)
+        ('hash_entries', hash_entries, {'forced_hash': forced_hash, 'validate': validate}),
+        # round numbers to cents and validate with final schema
+        ('finalize', _finalize_entries, {'validate': validate}),
+    ]
+    for name, func, kwargs in stages:
+        df = run_stage(name, func, df, hooks=hooks, **kwargs)
+
+    return df
+
+
+def _group_paths_by_account(accounts_by_path: list[Iterable[str]]) -> list[int]:
+    """
+    Groups paths so that all paths sharing an account are in the same group,
+    given the accounts in each path. Returns the group of each path.
+    """
+    parents = list(range(len(accounts_by_path)))
+
+    def find(i):
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    first_paths = {}
+    for i, accounts in enumerate(accounts_by_path):
+        for account in accounts:
+            parents[find(i)] = find(first_paths.setdefault(account, i))
+
+    return [find(i) for i in range(len(accounts_by_path))]
+
+
+def _group_entry_files_by_account(items: list[Path]) -> tuple[list[list[Path]], set[str]]:
+    """
+    Groups entry files so that all entries of an account are in the same group,
+    reading only the account names of entry files. Returns the groups and the
+    names of all accounts.
+    """
+    accounts_by_item = []
+    for item in items:
+        accounts = pd.read_csv(item, usecols=lambda c: c == 'account_name', dtype=str).get('account_name')
+        accounts_by_item.append([] if accounts is None else accounts.dropna().unique())
+
+    groups = {}
+    for item, group in zip(items, _group_paths_by_account(accounts_by_item)):
+        groups.setdefault(group, []).append(item)
+
+    return list(groups.values()), {account for accounts in accounts_by_item for account in accounts}
+
+
+def _fill_entries(df: DataFrame[MergedInputEntrySchema], validate: bool = True) -> DataFrame[MergedInputEntrySchema]:
+    """Posts repeat entries and fills balances, the stages of the pipeline that are independent per account"""
+    df = post_repeat_entries(df, validate=validate)
+    df = fill_balances(df, validate=validate)
+    return df
+
+
+def _fill_entries_in_parallel(
+        df: DataFrame[MergedInputEntrySchema],
+        validate: bool = True,
+        jobs: int = 2
+) -> DataFrame[MergedInputEntrySchema]:
+    """
+    Runs _fill_entries across a pool of processes. Entries are partitioned by
+    accounts sharing entry files, as new entries are numbered per file, and
+    partitions are packed into one batch per process by their number of entries.
+    """
+    pairs = pd.DataFrame({'path': df.index.get_level_values('path'), 'account_name': df['account_name'].to_numpy()})
+    accounts_by_path = pairs.drop_duplicates().groupby('path', observed=True)['account_name'].unique()
+    groups = pd.Series(_group_paths_by_account(accounts_by_path), index=accounts_by_path.index)
+    row_groups = pairs['path'].map(groups).to_numpy()
+
+    # largest partitions first, each into the batch with the fewest entries
+    sizes = pd.Series(row_groups).value_counts()
+    batch_sizes = [0] * min(jobs, len(sizes))
+    batches = {}
+    for group, size in sizes.items():
+        batch = batch_sizes.index(min(batch_sizes))
+        batch_sizes[batch] += size
+        batches[group] = batch
+    row_batches = pd.Series(row_groups).map(batches).to_numpy()
+
+    if len(batch_sizes) < 2:
+        return _fill_entries(df, validate=validate)
+
+    with ProcessPoolExecutor(max_workers=len(batch_sizes)) as executor:
+        dfs = list(executor.map(
+            _fill_entries,
+            [df[row_batches == batch] for batch in range(len(batch_sizes))],
+            [validate] * len(batch_sizes)
+        ))
+
+    return sort_entries(_concat_entries(dfs))
+
+
+def _iter_lint_entries(
+        items: list[Path],
+        forced_hash: bool = False,
+        validation: str = 'full',
+        hooks: Iterable[StageHook] = (),
+        jobs: int = 1
+) -> Iterator[DataFrame[MergedInputEntrySchema]]:
+    """
+    Runs the autofill pipeline like _lint_entries, but on one group of accounts
+    at a time, so only the largest group is held in memory. Entries are posted and
+    balanced per group and spilled to a temporary directory, keeping only transfer
+    candidates of all groups to pair them. Then, yields each group with
+    transaction IDs and hashes assigned.
+    """
+    validate = validation == 'full'
+    groups, accounts = _group_entry_files_by_account(items)
+
+    with tempfile.TemporaryDirectory() as spill_path:
+        spill_path = Path(spill_path)
+
+        # first pass: post and balance entries of each group, collect transfer candidates
+        candidates = []
+        for i, group in enumerate(groups):
+            df = run_stage('read', _read_entry_files, group, jobs=jobs, hooks=hooks)
+            df = run_stage('sort_entries', sort_entries, df, hooks=hooks)
+            df = run_stage('post_repeat_entries', post_repeat_entries, df, validate=validate, hooks=hooks)
+            df = run_stage('fill_balances', fill_balances, df, validate=validate, hooks=hooks)
+
+            mask_is_nan = df['transaction_id'].isna()
+            df.loc[mask_is_nan, 'transaction_id'] = [str(uuid.uuid4()) for _ in range(mask_is_nan.sum())]
+            candidates.append(df.loc[df['entity'].isin(accounts), _TRANSFER_COLUMNS])
+            df.to_pickle(spill_path / f'{i}.pkl')
+            del df
+
+        # pair transfers among candidates of all groups, in the order of a full lint
+        candidates_df = sort_entries(_concat_entries(candidates)) if candidates else None
+        if candidates_df is not None and not candidates_df.empty:
+            candidates_df = run_stage('assign_transactions', assign_transactions, candidates_df, validate=False,
+                                      hooks=hooks)
+            transaction_ids = candidates_df['transaction_id']
+        else:
+            transaction_ids = pd.Series(dtype=object)
+
+        # second pass: assign paired transaction IDs and hashes to each group
+        for i in range(len(groups)):
+            df = pd.read_pickle(spill_path / f'{i}.pkl')
+            paired_ids = transaction_ids[transaction_ids.index.get_level_values('path').isin(map(str, groups[i]))]
+            df.loc[paired_ids.index, 'transaction_id'] = paired_ids
+            if validate:
+                df = MergedInputEntrySchema.validate(df)
+            df = run_stage('hash_entries', hash_entries, df, forced_hash=forced_hash, validate=validate, hooks=hooks)
+            df = run_stage('finalize', _finalize_entries, df, validate=validate, hooks=hooks)
+            yield df
+
+
+def _find_view_module(module: str) -> str:
+    """Returns the name of a view module, trying default views of adfire first"""
+    for name in [f'adfire.{module}', module]:
+        try:
+            if importlib.util.find_spec(name):
+                return name
+        except ModuleNotFoundError:  # a parent package doesn't exist
+            continue
+    raise ImportError(f'No module named {module}')
+
+
+def _run_view_script(portfolio: 'Portfolio', module: str, output_dir: Path, args: list[str]):
+    """Runs a view module without a view function as a script, with the portfolio as a global"""
+    old_argv, old_cwd = sys.argv, os.getcwd()
+    os.chdir(output_dir)
+    sys.argv = [module, *args]
+    try:
+        runpy.run_module(module, init_globals={'portfolio': portfolio}, run_name='__main__')
+    finally:
+        sys.argv = old_argv
+        os.chdir(old_cwd)
+
+
 class Portfolio:
-    def __init__(self, path: os.PathLike):
-        """Creates a portfolio object from a directory."""
+    def __init__(
+            self,
+            path: os.PathLike,
+            jobs: int = 1,
+            accounts: Optional[Iterable[str]] = None,
+            since: Optional[datetime.date] = None,
+            until: Optional[datetime.date] = None,
+            validation: str = 'full'
+    ):
+        """
+        Creates a portfolio object from a directory. Entry files are read when
+        first needed, by the given number of threads, and accounts are linted
+        by the given number of processes.
+
+        If accounts are given, only entry files with entries of those accounts,
+        or of accounts that may pair transactions with them, are read and linted.
+        Linted entries are then those of the given accounts dated from since to
+        until. A filtered portfolio can't be formatted, and doesn't write the lint
+        cache if filtered by accounts.
+
+        Validation is one of VALIDATION_LEVELS: 'full' validates entries after
+        each lint stage, 'boundary' only when reading entry files and before
+        writing them, 'off' only when reading entry files, where raw values are
+        coerced.
+        """
         self.path = Path(path)
 
         self._metadata = _read_metadata_from_dir(self.path)
-        self._merged_entry_dfs = _read_entry_files_from_dir(self.path)
+        self._jobs = jobs
+        self._accounts = set(accounts) if accounts else None
+        self._since = since
+        self._until = until
         self._linted = None
         self._forced_hash = False
+        self._stage_hooks = []
+        self._refreshed = None
+        self.use_cache = True
+        self.streaming = False  # format lints one group of accounts at a time, see iter_lint()
+        self.validation = validation
+
+    @cached_property
+    def _merged_entry_dfs(self) -> DataFrame[MergedInputEntrySchema]:
+        return self._read_entries()
+
+    def _read_entries(
+            self,
+            cached: Optional[DataFrame[MergedInputEntrySchema]] = None
+    ) -> DataFrame[MergedInputEntrySchema]:
+        if self._accounts is not None:
+            return run_stage('read', _read_account_entry_files_from_dir, self.path, self._accounts, jobs=self._jobs,
+                             cached=cached, hooks=self._stage_hooks)
+        return run_stage('read', _read_entry_files_from_dir, self.path, jobs=self._jobs, cached=cached,
+                         hooks=self._stage_hooks)
+
+    @property
+    def is_filtered(self) -> bool:
+        """Whether linted entries are only of some accounts or dates"""
+        return self._accounts is not None or self._since is not None or self._until is not None
+
+    def _check_unfiltered(self, action: str):
+        if self.is_filtered:
+            raise ValueError(f"Can't {action} a portfolio filtered by accounts or dates")
+
+    @property
+    def jobs(self) -> int:
+        """Number of threads reading entry files and processes linting accounts, also used by views"""
+        return self._jobs
 
     @property
     def linted(self) -> DataFrame[MergedInputEntrySchema]:
+        """
+        Linted entries of this portfolio. If entry files were not modified since
+        the last format, and it validated entries at least as thoroughly, loads
+        the snapshot written by it instead of linting.
+
+        Each access returns a shallow copy, which shares data with the linted
+        entries, so callers may add, replace or drop columns without changing
+        them. Modifying values in place, as with loc or inplace operators, is safe
+        only with pandas copy-on-write mode enabled, as the CLI does, which copies
+        data of the columns modified.
+        """
+        return self._load_linted().copy(deep=False)
+
+    def _load_linted(self) -> DataFrame[MergedInputEntrySchema]:
+        if self._linted is None and self.use_cache:
+            self._linted = read_portfolio_snapshot(self.path, _find_entry_files_in_dir(self.path), self.validation)
+            if self._linted is not None and self.is_filtered:
+                self._linted = _filter_entries(self._linted, self._accounts, self._since, self._until)
         if self._linted is None:
             self._linted = self.lint()
         return self._linted
@@ -75,87 +517,323 @@ class Portfolio:
         self._forced_hash = value
         self._linted = None
 
+    @property
+    def validation(self) -> str:
+        return self._validation
+
+    @validation.setter
+    def validation(self, value: str):
+        if value not in VALIDATION_LEVELS:
+            raise ValueError(f"Validation must be one of {', '.join(VALIDATION_LEVELS)}, not {value!r}")
+        self._validation = value
+        self._linted = None
+
+    def add_stage_hook(self, hook: StageHook):
+        """
+        Adds a callable that is called with metrics of each stage of reading,
+        linting and formatting entries, e.g. a StageProfiler.
+        """
+        self._stage_hooks.append(hook)
+
     @classmethod
-    def from_new(cls, path: os.PathLike) -> 'Portfolio':
+    def from_new(cls, path: os.PathLike, jobs: int = 1) -> 'Portfolio':
         """
         Defines directory as a portfolio. If 'portfolio.json' exists, raises an error.
         Otherwise, if directory is empty, populate with sample portfolio; if not empty,
         create 'portfolio.json' from sample.
         """
-        path = Path(path)
-        metadata_path = path / 'portfolio.json'
-        metadata_file_exists = metadata_path.is_file()
+        init_portfolio_dir(path)
+        return cls(path, jobs=jobs)
+
+    def lint(self) -> DataFrame[MergedInputEntrySchema]:
+        """
+        Validates entries in this portfolio. If there are invalid entries,
+        raises an error.
+
+        If the portfolio was linted before, only accounts with changed entry
+        files, and accounts that may pair transactions with them, are linted
+        again; the rest are taken from the lint cache in '.adfire'. Entries of
+        those accounts are linted again only after the last month end before
+        their earliest changed entry, resuming balances cached for that month.
+
+        If the portfolio is filtered, returns only entries of its accounts and
+        dates. Entries before since are needed for balances, but with the lint
+        cache, unchanged entry files whose entries are all dated up to the last
+        month end before since are taken from the cache instead of read.
+        """
+        if not self.use_cache or self.forced_hash:  # forced hashes aren't cached, so hashes are verified again
+            df = self._lint_entries(self._merged_entry_dfs)
+        else:
+            df = self._lint_with_cache(read_cache(self.path), _read_checksums_from_dir(self.path)).linted
 
-        if metadata_file_exists:
-            raise FileExistsError(f"'{metadata_path}' already exists")
+        if self.is_filtered:
+            df = _filter_entries(df, self._accounts, self._since, self._until)
+        return df
 
-        dir_is_empty = path.exists() and path.is_dir() and not any(path.iterdir())
+    def _lint_with_cache(self, cache: Optional[LintCache], checksums: pd.Series) -> LintCache:
+        if cache is not None and (self.forced_hash or not cache.is_validated(self.validation)):
+            cache = None  # hashes of cached entries weren't verified, or entries weren't validated as thoroughly
 
-        if not dir_is_empty:
-            sample_file_path = RESOURCES_PATH / 'sample/portfolio.json'
-            shutil.copyfile(sample_file_path, metadata_path)
+        if cache is not None and not cache.get_changed_paths(checksums):
+            return cache  # no need to read entry files
+
+        if cache is None:
+            df = self._lint_entries(self._merged_entry_dfs)
+            cache = LintCache(checksums, df, balance_checkpoints(df), validation=self.validation)
         else:
-            sample_path = RESOURCES_PATH / 'sample'
-            shutil.copytree(
-                sample_path,
-                path,
-                dirs_exist_ok=True  # because we already know it's empty
+            cache = self._lint_incremental(cache, checksums)
+
+        # entries of other accounts are missing if filtered
+        if self.use_cache and not self.forced_hash and self._accounts is None:
+            write_cache(self.path, cache)
+
+        return cache
+
+    def watch(self, interval: float = 0.5) -> Iterator[Union[DataFrame[MergedInputEntrySchema], Exception]]:
+        """
+        Lints entries whenever entry files change, polling them with refresh()
+        every interval seconds, and yields the linted entries, or the error if
+        linting failed.
+        """
+        last_result = None
+        while True:
+            result = self.refresh()
+            if result is last_result:
+                time.sleep(interval)
+                continue
+            last_result = result
+            yield result
+
+    def refresh(self) -> Union[DataFrame[MergedInputEntrySchema], Exception]:
+        """
+        Lints entries again if the modification times or sizes of entry files
+        changed since the last refresh, and returns the linted entries, or the
+        error if linting failed. Entries and the lint cache are kept in memory,
+        so only changed entry files are read again and only accounts affected by
+        them are linted again.
+        """
+        self._check_unfiltered('refresh')
+        if self._refreshed is None:
+            self._refreshed = SimpleNamespace(
+                cache=read_cache(self.path) if self.use_cache else None,
+                checksums=pd.Series(dtype=str),
+                linted_stats={},  # stats of entry files as of the last successful lint
+                seen_stats=None,
+                result=None
             )
+        state = self._refreshed
 
-        return cls(path)
+        stats = _stat_entry_files_in_dir(self.path)
+        if stats == state.seen_stats:
+            return state.result
+        state.seen_stats = stats
 
-    def lint(self) -> DataFrame[MergedInputEntrySchema]:
+        # changed since the last successful lint, so files that failed are read again
+        changed = [path for path, stat in stats.items() if state.linted_stats.get(path) != stat]
+        removed = [path for path in state.linted_stats if path not in stats]
+        merged_entry_dfs = vars(self).get('_merged_entry_dfs')
+        try:
+            checksums = state.checksums.drop(removed, errors='ignore')
+            for path in changed:
+                checksums[path] = checksum_record(path)
+
+            if merged_entry_dfs is not None and state.linted_stats:
+                # only entry files that changed are read again
+                paths = merged_entry_dfs.index.get_level_values('path')
+                dfs = [merged_entry_dfs[~paths.isin(changed + removed)]]
+                if changed:
+                    dfs.append(_read_entry_files([Path(path) for path in changed], jobs=self._jobs))
+                self._merged_entry_dfs = _concat_entries(dfs)
+            cache = self._lint_with_cache(state.cache, checksums)
+        except Exception as e:
+            if merged_entry_dfs is not None:
+                self._merged_entry_dfs = merged_entry_dfs
+            state.result = e
+            return e
+
+        state.checksums = checksums
+        state.linted_stats = stats
+        state.cache = cache
+        df = cache.linted
+        state.result = df
+        self._linted = df
+        return df
+
+    def iter_lint(self) -> Iterator[DataFrame[MergedInputEntrySchema]]:
         """
-        Validates entries in this portfolio. If there are invalid entries,
-        raises an error.
+        Lints entries in this portfolio one group of accounts at a time, where a
+        group holds all accounts sharing entry files, and yields the linted
+        entries of each group. Peak memory is bounded by the largest group rather
+        than the whole portfolio. The lint cache is neither read nor written.
         """
-        # following computations require df to be sorted already
-        df = sort_entries(self._merged_entry_dfs)
+        self._check_unfiltered('stream')
+        return _iter_lint_entries(
+            _find_entry_files_in_dir(self.path),
+            forced_hash=self.forced_hash,
+            validation=self.validation,
+            hooks=self._stage_hooks,
+            jobs=self._jobs
+        )
 
-        # post occurrences of recurring entries
-        df = post_repeat_entries(df)
+    def _lint_entries(
+            self,
+            df: DataFrame[MergedInputEntrySchema],
+            openings: Optional[pd.DataFrame] = None
+    ) -> DataFrame[MergedInputEntrySchema]:
+        return _lint_entries(
+            df,
+            forced_hash=self.forced_hash,
+            validation=self.validation,
+            hooks=self._stage_hooks,
+            jobs=self._jobs,
+            openings=openings
+        )
 
-        # autofill balances
-        df = fill_current_balances(df)
-        df = fill_total_balances(df)
-        df = fill_available_balances(df)
+    def _lint_incremental(self, cache: LintCache, checksums: pd.Series, settle: bool = True) -> LintCache:
+        # entries reported from since are linted again from a checkpoint before it, so older files aren't read
+        settled = set()
+        if settle and self._since is not None:
+            settled = cache.get_settled_paths(checksums, self._since)
+        if settled:
+            df = self._read_entries(cached=cache.linted[cache.linted.index.get_level_values('path').isin(settled)])
+        else:
+            df = self._merged_entry_dfs
+        changed = cache.get_changed_accounts(df, checksums)
+        if not changed:
+            return LintCache(checksums, cache.linted, cache.checkpoints, validation=cache.validation)
 
-        # assign ids (include pairing)
-        df = assign_transactions(df)
+        # linked accounts are linted again from their cached entries, as if their files were formatted
+        linked = get_linked_accounts(df, changed)
+        accounts = changed | linked
+        mask_changed = df['account_name'].isin(changed)
+        mask_linked = cache.linted['account_name'].isin(linked)
+        relinted_df = _concat_entries([df[mask_changed], cache.linted[mask_linked]])
 
-        # assign hashes (depends on order of entries in the account)
-        df = hash_entries(df, forced_hash=self.forced_hash)
+        # entries up to the latest usable checkpoint are taken from the cache, later ones resume from it
+        checkpoint = cache.find_checkpoint(relinted_df, accounts)
 
-        # round numbers to cents
-        df = df.round(2)
-        df = df.replace(-0.0, 0.0)
+        # cached entries standing in for settled files carry balances of the last lint, which would be taken as
+        # given if linted again, so those of changed accounts must be up to the checkpoint, or files are read
+        mask_settled = mask_changed & df.index.get_level_values('path').isin(settled)
+        if mask_settled.any() and (checkpoint is None or df.loc[mask_settled, 'date'].max() > checkpoint):
+            return self._lint_incremental_from_files(cache, checksums, df, settled)
 
-        # validate with final schema
-        df = MergedInputEntrySchema.validate(df)
-        df = df[MergedInputEntrySchema.to_schema().columns.keys()]
+        linted_df = None
+        if checkpoint is not None:
+            openings = cache.get_openings(checkpoint, accounts)
+            mask_cached = cache.linted['account_name'].isin(accounts) & (cache.linted['date'] <= checkpoint)
+            mask_later = relinted_df['date'] > checkpoint
+            dfs = [cache.linted[mask_cached]]
+            if mask_later.any():
+                dfs.append(self._lint_entries(relinted_df[mask_later], openings=openings))
+            linted_df = _concat_entries(dfs)
+            if linted_df.index.has_duplicates:  # new entries numbered after later entries only
+                linted_df = None
+        if linted_df is None:
+            if mask_settled.any():
+                return self._lint_incremental_from_files(cache, checksums, df, settled)
+            checkpoint = None
+            linted_df = self._lint_entries(relinted_df)
 
-        return df
+        mask_unaffected = ~cache.linted['account_name'].isin(accounts)
+        df = _concat_entries([cache.linted[mask_unaffected], linted_df])
+        df = sort_entries(df)
 
-    def format(self):
+        # checkpoints of linted accounts are computed again after the checkpoint they resumed from, if any
+        if cache.checkpoints is None:
+            checkpoints = balance_checkpoints(df)
+        else:
+            mask_kept = ~cache.checkpoints['account_name'].isin(accounts)
+            linted_df = df[df['account_name'].isin(accounts)]
+            if checkpoint is None:
+                new_checkpoints = balance_checkpoints(linted_df)
+            else:
+                mask_kept |= cache.checkpoints['date'] <= checkpoint
+                new_checkpoints = balance_checkpoints(linted_df[linted_df['date'] > checkpoint], openings)
+            checkpoints = pd.concat([cache.checkpoints[mask_kept], new_checkpoints], ignore_index=True)
+            checkpoints = checkpoints.sort_values(by='date', kind='stable', ignore_index=True)
+
+        return LintCache(checksums, df, checkpoints, validation=self.validation)
+
+    def _lint_incremental_from_files(
+            self,
+            cache: LintCache,
+            checksums: pd.Series,
+            df: DataFrame[MergedInputEntrySchema],
+            settled: set[str]
+    ) -> LintCache:
+        """Lints incrementally again with settled files read, keeping entries of files already read"""
+        self._merged_entry_dfs = self._read_entries(cached=df[~df.index.get_level_values('path').isin(settled)])
+        return self._lint_incremental(cache, checksums, settle=False)
+
+    def format(self) -> int:
         """
         Lints portfolio and modifies entry files with standard formatting and
-        implied values.
+        implied values. Only entry files whose content changes are written.
+        Also writes a snapshot of the formatted entries for later reads of
+        linted entries. Returns the number of entry files written.
+
+        If streaming, entry files are formatted one group of accounts at a time
+        instead, without writing a snapshot.
         """
-        df = self.linted
-        groups = df.groupby('path')
-        for path, group_df in groups:
-            group_df = EntrySchema.validate(group_df)
-            group_df = group_df[EntrySchema.to_schema().columns.keys()]
-            write_record(group_df, path)
+        self._check_unfiltered('format')
+        if self.streaming:
+            return sum(
+                run_stage('write', self._write_entry_files, df, hooks=self._stage_hooks) for df in self.iter_lint())
+
+        df = self._load_linted()
+        n_written = run_stage('write', self._write_entry_files, df, hooks=self._stage_hooks)
+        write_portfolio_snapshot(self.path, df, _find_entry_files_in_dir(self.path), self.validation)
+        return n_written
+
+    def _write_entry_files(self, df: DataFrame[MergedInputEntrySchema]) -> int:
+        # validated and selected once for all entry files, instead of per file
+        if self.validation != 'off':
+            df = EntrySchema.validate(df)
+        df = df[schema_columns(EntrySchema)]
+
+        n_written = 0
+        for path, group_df in df.groupby('path'):
+            n_written += write_record_if_changed(group_df, path)
+        return n_written
 
     def view(self, module: str, *args):
-        report_path = f'.reports/{module.removeprefix("adfire.")}'
-        old_argv = sys.argv
-        spec = importlib.util.find_spec(module)
-        if spec:
-            os.makedirs(report_path, exist_ok=True)
-            os.chdir(report_path)
-            sys.argv = [module, *args]
-        runpy.run_module(module, init_globals={'portfolio': self}, run_name="__main__")
-        sys.argv = old_argv
-        os.chdir(self.path.resolve())
+        """Runs a view module on this portfolio with the given arguments, see view_all()"""
+        self.view_all([(module, list(args))])
+
+    def view_all(self, views: list[tuple[str, list[str]]], reports_path: os.PathLike = '.reports'):
+        """
+        Runs view modules, each with its arguments, on entries of this portfolio
+        linted once for all of them. Reports of a view are written to a directory
+        named after it in the reports path.
+
+        Views defining view(portfolio, output_dir, args) are called directly, by
+        as many threads as jobs of this portfolio. Other views are run as scripts
+        one after another, in their report directory and with their arguments in
+        sys.argv.
+        """
+        reports_path = Path(reports_path).resolve()
+        modules = [(_find_view_module(module), args) for module, args in views]  # before any view runs
+        self._load_linted()  # linted once, and before scripts change the working directory
+
+        calls, scripts = [], []
+        for module, args in modules:
+            output_dir = reports_path / module.removeprefix('adfire.')
+            output_dir.mkdir(parents=True, exist_ok=True)
+            func = getattr(importlib.import_module(module), 'view', None)
+            if callable(func):
+                calls.append((func, output_dir, args))
+            else:
+                scripts.append((module, output_dir, args))
+
+        if self._jobs > 1 and len(calls) > 1:
+            with ThreadPoolExecutor(max_workers=self._jobs) as executor:
+                futures = [executor.submit(func, self, output_dir, args) for func, output_dir, args in calls]
+                for future in futures:
+                    future.result()  # raises errors of any view
+        else:
+            for func, output_dir, args in calls:
+                func(self, output_dir, args)
+
+        for module, output_dir, args in scripts:
+            _run_view_script(self, module, output_dir, args)
@@ -1,31 +1,34 @@
+from functools import lru_cache
+
+import pandas as pd
 import pandera as pa
 from pandera.typing import Index
 
 
 class EntrySchema(pa.DataFrameModel):
+    # low-cardinality columns are categoricals, coerced from strings of entry files
     date: pa.Date
-    status: str
+    status: pa.Category = pa.Field(coerce=True)
     repeat: str = pa.Field(nullable=True)
     amount: float
     balance_current: float
     balance_total: float
     balance_available: float = pa.Field(nullable=True)
     balance_limit: float = pa.Field(nullable=True)
-    entity: str
-    account_name: str
-    account_mask: str
-    account_type: str
-    account_subtype: str
+    entity: pa.Category = pa.Field(coerce=True)
+    account_name: pa.Category = pa.Field(coerce=True)
+    account_mask: pa.Category = pa.Field(coerce=True)
+    account_type: pa.Category = pa.Field(coerce=True)
+    account_subtype: pa.Category = pa.Field(coerce=True)
     description: str = pa.Field(nullable=True)
-    category: str = pa.Field(nullable=True)
+    category: pa.Category = pa.Field(nullable=True, coerce=True)
     transaction_id: str = pa.Field(nullable=True)
-    hash: str = pa.Field(nullable=True)
+    hash: pd.UInt64Dtype = pa.Field(nullable=True, coerce=True)  # 64-bit hashes, compared as numbers
 
 
 class InputEntrySchema(EntrySchema):
     balance_current: float = pa.Field(nullable=True)
     balance_total: float = pa.Field(nullable=True)
-    hash: str = pa.Field(nullable=True)
 
     class Config:
         add_missing_columns = True
@@ -39,11 +42,12 @@ class MergedInputEntrySchema(InputEntrySchema):
 
 
 class HashableEntrySchema(MergedInputEntrySchema):
-    status: str = pa.Field(eq='posted')
+    status: pa.Category = pa.Field(eq='posted', coerce=True)
     balance_current: float = pa.Field(nullable=False)
     transaction_id: str = pa.Field(nullable=False)
 
     @classmethod
+    @lru_cache(maxsize=None)  # pandera caches schemas of models, but not of overridden to_schema
     def to_schema(cls) -> pa.DataFrameSchema:
         schema = super().to_schema()
         return schema.remove_columns(['description', 'category', 'hash'])
@@ -58,3 +62,23 @@ class AccountBalancesSchema(pa.DataFrameModel):
 
     class Config:
         strict = 'filter'
+
+
+# schemas are built once, so lists of their columns are too
+
+@lru_cache(maxsize=None)
+def schema_columns(model: type[pa.DataFrameModel]) -> list[str]:
+    """Names of columns of a schema, in order"""
+    return list(model.to_schema().columns)
+
+
+@lru_cache(maxsize=None)
+def required_columns(model: type[pa.DataFrameModel]) -> list[str]:
+    """Names of columns of a schema that can't have missing values"""
+    return [name for name, column in model.to_schema().columns.items() if not column.nullable]
+
+
+@lru_cache(maxsize=None)
+def categorical_columns(model: type[pa.DataFrameModel]) -> list[str]:
+    """Names of columns of a schema stored as categoricals"""
+    return [name for name, column in model.to_schema().columns.items() if str(column.dtype) == 'category']
@@ -0,0 +1,143 @@
+import contextlib
+import io
+import json
+import os
+import secrets
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from adfire.config import CACHE_DIRNAME
+
+if TYPE_CHECKING:  # clients don't load pandas to send requests
+    from adfire.portfolio import Portfolio
+
+SERVE_FILENAME = 'serve.json'
+
+
+class ServeError(Exception):
+    """Error raised by a request to a running daemon"""
+
+
+class PortfolioServer(HTTPServer):
+    """
+    HTTP server on localhost answering lint and view requests of a portfolio held
+    in memory. Entry files are linted again on requests only if they changed.
+    Requests are handled one at a time, as views change the working directory.
+    """
+
+    def __init__(self, portfolio: 'Portfolio', port: int = 0):
+        super().__init__(('127.0.0.1', port), _RequestHandler)
+        self.portfolio = portfolio
+        self.token = secrets.token_hex(16)
+
+    def handle_command(self, request: dict) -> dict:
+        """Runs a command and returns its printed output, and its error if it failed"""
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output):
+                result = self.portfolio.refresh()
+                if isinstance(result, Exception):
+                    raise result
+                if request['command'] == 'view':
+                    self._view(result, request)
+                elif request['command'] != 'lint':
+                    raise ValueError(f"Unknown command '{request['command']}'")
+        except Exception as e:
+            return {'output': output.getvalue(), 'error': f'{type(e).__name__}: {e}'}
+        return {'output': output.getvalue(), 'error': None}
+
+    def _view(self, linted, request: dict):
+        self.portfolio._linted = linted  # views get copy-on-write copies, so may modify them
+        # reports are written relative to the working directory of the client
+        self.portfolio.view_all(request['views'], reports_path=Path(request['cwd']) / '.reports')
+
+    def write_info(self):
+        """
+        Writes the port and token of this server, and the settings it lints with,
+        to '.adfire/serve.json', readable only by the owner.
+        """
+        path = self.portfolio.path / CACHE_DIRNAME / SERVE_FILENAME
+        path.parent.mkdir(parents=True, exist_ok=True)
+        settings = {
+            'validation': self.portfolio.validation,
+            'use_cache': self.portfolio.use_cache,
+            'forced_hash': self.portfolio.forced_hash,
+        }
+        info = {'pid': os.getpid(), 'port': self.server_address[1], 'token': self.token, 'settings': settings}
+        with open(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+            json.dump(info, f)
+
+    def remove_info(self):
+        path = self.portfolio.path / CACHE_DIRNAME / SERVE_FILENAME
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server: PortfolioServer
+
+    def do_POST(self):
+        if self.headers.get('Authorization') != f'Bearer {self.server.token}':
+            self.send_error(403)
+            return
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        body = json.dumps(self.server.handle_command(request)).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # requests are not logged
+
+
+def serve(portfolio: 'Portfolio', port: int = 0):
+    """Serves a portfolio until interrupted"""
+    server = PortfolioServer(portfolio, port=port)
+    portfolio.refresh()  # so the first request doesn't wait for a full lint
+    server.write_info()
+    print(f'Serving {portfolio.path.resolve()} at http://127.0.0.1:{server.server_address[1]}', flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.remove_info()
+
+
+def request_server(
+        path: os.PathLike,
+        request: dict,
+        settings: Optional[dict] = None,
+        timeout: float = 600
+) -> Optional[dict]:
+    """
+    Sends a request to the daemon serving the portfolio in a path, and returns
+    its response, or None if no daemon is running. If settings are given, such
+    as the validation level, the request is only sent to a daemon linting with
+    the same settings.
+    """
+    try:
+        with open(Path(path) / CACHE_DIRNAME / SERVE_FILENAME) as f:
+            info = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if settings is not None and info.get('settings') != settings:
+        return None
+
+    http_request = urllib.request.Request(
+        f'http://127.0.0.1:{info["port"]}',
+        data=json.dumps(request).encode(),
+        headers={'Authorization': f'Bearer {info["token"]}', 'Content-Type': 'application/json'},
+        method='POST'
+    )
+    try:
+        with urllib.request.urlopen(http_request, timeout=timeout) as response:
+            return json.load(response)
+    except (ConnectionError, urllib.error.URLError):
+        return None  # the daemon stopped without removing its info
@@ -0,0 +1,67 @@
+import json
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Iterable
+
+import pandas as pd
+
+StageHook = Callable[[dict], None]
+
+
+def run_stage(name: str, func: Callable, *args, hooks: Iterable[StageHook] = (), **kwargs):
+    """
+    Runs a stage of a pipeline, then calls each hook with metrics of the stage:
+    its name, wall time in seconds, number of rows of the result if it's a
+    dataframe, and peak traced memory in bytes if memory allocations are traced.
+    """
+    hooks = list(hooks)
+    if not hooks:
+        return func(*args, **kwargs)
+
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    seconds = time.perf_counter() - start
+
+    metrics = {
+        'stage': name,
+        'seconds': seconds,
+        'rows': len(result) if isinstance(result, pd.DataFrame) else None,
+        'peak_memory': tracemalloc.get_traced_memory()[1] if tracing else None,
+    }
+    for hook in hooks:
+        hook(metrics)
+
+    return result
+
+
+class StageProfiler:
+    """
+    Stage hook that records metrics of each stage. Traces memory allocations while
+    used as a context manager, so peak memory of stages is recorded too.
+    """
+
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, metrics: dict):
+        self.records.append(metrics)
+
+    def __enter__(self) -> 'StageProfiler':
+        tracemalloc.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        tracemalloc.stop()
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.records, columns=['stage', 'seconds', 'rows', 'peak_memory'])
+
+    def write(self, path: Path):
+        """Writes recorded metrics to a JSON file"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.records, f, indent=2)
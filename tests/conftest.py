@@ -34,7 +34,7 @@ def unsorted_entries():
         'description': ['', '', '', '', '', '', ''],
         'category': ['', '', '', '', '', '', ''],
         'transaction_id': ['', '', '', '', '', '', ''],
-        'hash': ['', '', '', '', '', '', ''],
+        'hash': [None, None, None, None, None, None, None],
     })
     df = df.set_index(['path', 'entry_id'])
     return df
@@ -59,7 +59,7 @@ def unfilled_current_balances():
         'description': ['', '', '', '', '', '', ''],
         'category': ['', '', '', '', '', '', ''],
         'transaction_id': ['', '', '', '', '', '', ''],
-        'hash': ['', '', '', '', '', '', ''],
+        'hash': [None, None, None, None, None, None, None],
     })
     df = df.set_index(['path', 'entry_id'])
     return df
@@ -86,5 +86,5 @@ def posted_repeat_entry():
         'description': np.nan,
         'category': np.nan,
         'transaction_id': np.nan,
-        'hash': np.nan,
+        'hash': pd.NA,
     })
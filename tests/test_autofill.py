@@ -1,9 +1,12 @@
+import datetime
+
 import numpy as np
 import pandas as pd
-from pandas.testing import assert_series_equal
+import pytest
+from pandas.testing import assert_series_equal, assert_frame_equal
 
 from adfire.autofill import sort_entries, fill_current_balances, hash_entries, assign_transactions, \
-    post_repeat_entries
+    post_repeat_entries, fill_balances, fill_total_balances, fill_available_balances, balance_checkpoints
 from adfire.io import read_record
 from adfire.schema import MergedInputEntrySchema
 
@@ -99,6 +102,21 @@ class TestExplodeRepeatEntries:
 
             assert_series_equal(df.reset_index().iloc[1], posted_entry1, check_names=False)
 
+        def test_when_many_repeat_entries_in_same_file(self, posted_repeat_entry):
+            other_repeat_entry = posted_repeat_entry.copy()
+            other_repeat_entry['entry_id'] = 1
+            other_repeat_entry['entity'] = 'Netflix'
+
+            df = pd.concat([posted_repeat_entry, other_repeat_entry], axis=1).T
+            df = df.set_index(['path', 'entry_id'])
+            df = post_repeat_entries(df)
+            assert len(df) == 4
+            assert df.index.is_unique
+
+            pending_df = df[df['status'] == 'pending'].reset_index()
+            assert list(pending_df['entry_id']) == [2, 3]
+            assert list(pending_df['entity']) == ['Spotify', 'Netflix']
+
     class TestShouldNotPost:
         def test_when_only_pending(self, posted_repeat_entry):
             unposted_repeat_entry = posted_repeat_entry.copy()
@@ -145,6 +163,86 @@ class TestFillCurrentBalances:
         expected = unfilled_current_balances['balance_current'].cumsum()
         assert_series_equal(actual, expected)
 
+    def test_should_offset_balances_by_input_balance(self, unfilled_current_balances):
+        df = unfilled_current_balances.copy()
+        df['status'] = 'posted'
+        df = sort_entries(df)
+        df.iloc[2, df.columns.get_loc('balance_current')] = 100.0
+        df = fill_current_balances(df)
+        actual = df['balance_current']
+        expected = df['amount'].cumsum() - df['amount'].iloc[:3].sum() + 100.0
+        assert_series_equal(actual, expected, check_names=False)
+
+    def test_should_report_all_mismatched_accounts(self, unfilled_current_balances):
+        df = unfilled_current_balances.copy()
+        df['status'] = 'posted'
+        df['account_name'] = ['A', 'A', 'B', 'B', 'C', 'C', 'C']
+        df['balance_current'] = [0.0, 0.0, 0.0, 0.0, np.nan, np.nan, np.nan]
+        with pytest.raises(AssertionError, match='accounts: A, B$'):
+            fill_current_balances(df)
+
+
+class TestFillBalances:
+    def test_should_equal_filling_each_balance(self, sample_formatted_path):
+        path = sample_formatted_path / 'accounts/chase freedom student.csv'
+        df = read_record(path)
+        df['path'] = path
+        df['entry_id'] = df.index
+        df = df.set_index(['path', 'entry_id'])
+        df = MergedInputEntrySchema.validate(df)
+        actual = fill_balances(df.copy())
+        expected = fill_available_balances(fill_total_balances(fill_current_balances(df.copy())))
+        assert_frame_equal(actual, expected)
+
+
+class TestBalanceCheckpoints:
+    @pytest.fixture
+    def unfilled_entries(self):
+        rng = np.random.default_rng(0)
+        n = 400
+        df = pd.DataFrame({
+            'path': 'a',
+            'entry_id': range(n),
+            'date': pd.date_range('2024-01-01', periods=n, freq='D').date,
+            'status': rng.choice(['posted', 'pending'], n, p=[0.9, 0.1]),
+            'repeat': np.nan,
+            'amount': rng.integers(-20000, 20000, n) / 100,
+            'balance_current': np.nan,
+            'balance_total': np.nan,
+            'balance_available': np.nan,
+            'balance_limit': 700.0,
+            'entity': 'Kroger',
+            'account_name': 'Chase Freedom Unlimited',
+            'account_mask': 'xxxx',
+            'account_type': 'credit',
+            'account_subtype': 'credit card',
+            'description': np.nan,
+            'category': np.nan,
+            'transaction_id': np.nan,
+            'hash': pd.NA,
+        })
+        df = df.set_index(['path', 'entry_id'])
+        return MergedInputEntrySchema.validate(df)
+
+    def test_should_keep_last_entry_of_each_month(self, unfilled_entries):
+        df = fill_balances(unfilled_entries)
+        checkpoints = balance_checkpoints(df)
+        assert len(checkpoints) == 14
+        assert checkpoints['date'].iloc[0] == datetime.date(2024, 1, 31)
+
+        last = df[df['date'] <= datetime.date(2024, 1, 31)].iloc[-1]
+        assert checkpoints['balance_current'].iloc[0] == last['balance_current']
+        assert checkpoints['balance_total'].iloc[0] == last['balance_total']
+
+    def test_should_fill_balances_from_checkpoint_like_from_first_entry(self, unfilled_entries):
+        expected = fill_balances(unfilled_entries.copy())
+
+        mask_later = expected['date'] > datetime.date(2024, 9, 30)
+        checkpoints = balance_checkpoints(expected[~mask_later])
+        openings = checkpoints.drop_duplicates('account_name', keep='last').set_index('account_name')
+        actual = fill_balances(unfilled_entries[mask_later].copy(), openings=openings)
+        assert_frame_equal(actual, expected[mask_later], check_exact=True)
+
 
 class TestAssignTransactions:
     def test_should_keep_assigned_transactions_unchanged(self, sample_formatted_path):
@@ -158,6 +256,51 @@ class TestAssignTransactions:
         expected = df['transaction_id']
         assert_series_equal(actual, expected)
 
+    @staticmethod
+    def make_transfers(entry, dates, account_name, entity, amount):
+        entries = []
+        for date in dates:
+            transfer = entry.copy()
+            transfer['path'] = account_name
+            transfer['entry_id'] = len(entries)
+            transfer['date'] = pd.to_datetime(date).date()
+            transfer['repeat'] = np.nan
+            transfer['amount'] = amount
+            transfer['account_name'] = account_name
+            transfer['account_type'] = 'depository'
+            transfer['entity'] = entity
+            entries.append(transfer)
+        return entries
+
+    def test_should_pair_recurring_transfers(self, posted_repeat_entry):
+        dates = pd.date_range('2020-01-01', periods=24, freq='MS')
+        df = pd.DataFrame([
+            *self.make_transfers(posted_repeat_entry, dates, 'Checking', 'Savings', -500.0),
+            *self.make_transfers(posted_repeat_entry, dates + pd.Timedelta(days=2), 'Savings', 'Checking', 500.0),
+        ])
+        df = df.set_index(['path', 'entry_id'])
+        df = MergedInputEntrySchema.validate(df)
+        df = sort_entries(df)
+        df = assign_transactions(df)
+
+        assert df['transaction_id'].nunique() == 24
+        checking_ids = df.loc['Checking', 'transaction_id']
+        savings_ids = df.loc['Savings', 'transaction_id']
+        assert list(checking_ids) == list(savings_ids)
+
+    def test_should_not_pair_entry_twice(self, posted_repeat_entry):
+        df = pd.DataFrame([
+            *self.make_transfers(posted_repeat_entry, ['2024-01-01', '2024-01-03'], 'Checking', 'Savings', -500.0),
+            *self.make_transfers(posted_repeat_entry, ['2024-01-02'], 'Savings', 'Checking', 500.0),
+        ])
+        df = df.set_index(['path', 'entry_id'])
+        df = MergedInputEntrySchema.validate(df)
+        df = sort_entries(df)
+        df = assign_transactions(df)
+
+        assert df['transaction_id'].nunique() == 2
+        assert df.loc[('Checking', 0), 'transaction_id'] == df.loc[('Savings', 0), 'transaction_id']
+
 
 class TestHashTransactions:
     def test_should_keep_hashed_entries_unchanged(self, sample_formatted_path):
@@ -170,3 +313,28 @@ class TestHashTransactions:
         actual = hash_entries(df)['hash']
         expected = df['hash']
         assert_series_equal(actual, expected)
+
+    def test_should_raise_on_modified_hashed_entries(self, sample_formatted_path):
+        path = sample_formatted_path / 'accounts/chase freedom student.csv'
+        df = read_record(path)
+        df['path'] = path
+        df['entry_id'] = df.index
+        df = df.set_index(['path', 'entry_id'])
+        df = MergedInputEntrySchema.validate(df)
+        df.loc[df.index[0], 'entity'] = 'Uniqlo'
+
+        with pytest.raises(AssertionError, match="Hashes don't match computed for accounts: Chase Freedom Student"):
+            hash_entries(df)
+        assert hash_entries(df.copy(), forced_hash=True)['hash'].notna().any()
+
+    def test_should_only_hash_posted_entries(self, sample_formatted_path):
+        path = sample_formatted_path / 'accounts/chase freedom student.csv'
+        df = read_record(path)
+        df['path'] = path
+        df['entry_id'] = df.index
+        df = df.set_index(['path', 'entry_id'])
+        df = MergedInputEntrySchema.validate(df)
+
+        df = hash_entries(df)
+        assert df['hash'].dtype == 'UInt64'
+        assert (df['hash'].notna() == (df['status'] == 'posted')).all()
@@ -0,0 +1,62 @@
+import os
+import sys
+
+from adfire.__main__ import main
+from adfire.bench import generate_portfolio, run_benchmarks
+from adfire.portfolio import Portfolio
+from tests.utils import dir_is_equal
+
+
+class TestGeneratePortfolio:
+    def test_should_be_deterministic(self, tmp_path):
+        generate_portfolio(tmp_path / 'a', accounts=3, entries_per_year=50, seed=1)
+        generate_portfolio(tmp_path / 'b', accounts=3, entries_per_year=50, seed=1)
+        assert dir_is_equal(tmp_path / 'a', tmp_path / 'b')
+
+    def test_should_generate_lintable_portfolio(self, tmp_path):
+        generate_portfolio(tmp_path, accounts=4, years=2, entries_per_year=50, repeat_share=0.3, transfer_share=0.2)
+        df = Portfolio(tmp_path).lint()
+
+        assert set(df['account_name']) == {'Checking 0', 'Credit 1', 'Checking 2', 'Credit 3'}
+        assert df['repeat'].notna().any()
+
+        # both sides of transfers share transaction IDs
+        transfers_df = df[df['entity'].isin(df['account_name'])]
+        assert (transfers_df.groupby('transaction_id').size() == 2).any()
+
+    def test_should_hash_share_of_entries(self, tmp_path):
+        generate_portfolio(tmp_path, accounts=2, entries_per_year=100, hashed_share=0.5)
+        df = Portfolio(tmp_path)._merged_entry_dfs
+        assert 0 < df['hash'].notna().mean() < 1
+
+
+class TestRunBenchmarks:
+    def test_should_time_all_stages(self, tmp_path):
+        generate_portfolio(tmp_path, accounts=2, entries_per_year=20)
+        results = run_benchmarks(tmp_path, views=['adfire.balances'])
+
+        assert list(results['stage']) == [
+            'read', 'sort_entries', 'post_repeat_entries', 'fill_balances', 'assign_transactions', 'hash_entries',
+            'lint', 'lint (cached)', 'format', 'linted (snapshot)', 'view adfire.balances'
+        ]
+        assert (results['seconds'] > 0).all()
+        assert not (tmp_path / '.adfire').exists()  # benchmarked on a copy
+
+    def test_should_format_in_each_round(self, tmp_path, monkeypatch):
+        generate_portfolio(tmp_path, accounts=2, entries_per_year=20)
+        n_written = []
+        format_portfolio = Portfolio.format
+        monkeypatch.setattr(Portfolio, 'format', lambda self: n_written.append(format_portfolio(self)))
+
+        run_benchmarks(tmp_path, rounds=2, views=[])
+        assert n_written == [2, 2]
+
+
+class TestBenchMode:
+    def test_on_empty_dir(self, tmp_path, capsys):
+        os.chdir(tmp_path)
+
+        sys.argv = ['adfire', 'bench', '--accounts', '2', '--entries-per-year', '20']
+        main()
+        assert 'lint (cached)' in capsys.readouterr().out
+        assert not any(tmp_path.iterdir())
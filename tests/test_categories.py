@@ -0,0 +1,44 @@
+import datetime
+
+import pandas as pd
+import pandas.testing as tm
+
+from adfire.categories import categorize_by_year_month
+
+
+def _entries():
+    return pd.DataFrame({
+        'date': [datetime.date(2024, 1, 5), datetime.date(2024, 1, 9), datetime.date(2024, 1, 20),
+                 datetime.date(2024, 2, 3), datetime.date(2024, 2, 8)],
+        'amount': [-10.0, -5.0, 100.0, -2.5, -1.0],
+        'account_type': pd.Categorical(['depository', 'depository', 'depository', 'credit', 'depository']),
+        'category': pd.Categorical(['expenses.food.groceries.produce', 'expenses.food', 'income.salary',
+                                    'expenses.food.groceries.produce', None]),
+    })
+
+
+class TestCategorizeByYearMonth:
+    def test_on_defined_categories(self):
+        actual = categorize_by_year_month(_entries())
+        expected = pd.DataFrame(
+            {
+                'expenses.food.groceries.produce': [10.0, -2.5],
+                'expenses.food': [15.0, -2.5],  # with its descendants
+                'income.salary': [100.0, 0.0],
+            },
+            index=pd.MultiIndex.from_tuples([(2024, 1), (2024, 2)], names=['year', 'month'])
+        )
+        tm.assert_frame_equal(actual, expected, check_names=False, check_dtype=False, check_index_type=False)
+
+    def test_on_given_categories(self):
+        actual = categorize_by_year_month(_entries(), categories=['expenses', 'expenses.food.groceries', 'savings'])
+        assert actual.to_dict('list') == {
+            'expenses': [15.0, -2.5],
+            'expenses.food.groceries': [10.0, -2.5],
+            'savings': [0.0, 0.0],
+        }
+
+    def test_should_not_modify_entries(self):
+        df = _entries()
+        categorize_by_year_month(df)
+        tm.assert_frame_equal(df, _entries())
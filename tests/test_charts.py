@@ -0,0 +1,50 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from adfire.charts import render_charts
+
+
+@pytest.fixture
+def series_df():
+    return pd.DataFrame(
+        {'income': [100.0, 120.0], 'expenses': [-20.0, -35.5]},
+        index=pd.to_datetime(['2024-01-01', '2024-02-01'])
+    )
+
+
+class TestRenderCharts:
+    def test_as_json(self, tmp_path, series_df):
+        path = tmp_path / 'chart.json'
+        render_charts([{'df': series_df, 'title': 'Trends', 'path': str(path)}])
+
+        with open(path) as f:
+            assert json.load(f) == {
+                'title': 'Trends',
+                'x': ['2024-01-01', '2024-02-01'],
+                'series': {'income': [100.0, 120.0], 'expenses': [-20.0, -35.5]},
+            }
+
+    @pytest.mark.parametrize('jobs', [1, 2])
+    def test_as_images(self, tmp_path, series_df, jobs):
+        charts = [
+            {'df': series_df, 'title': 'Trends', 'path': str(tmp_path / 'trends.png')},
+            {'df': series_df.cumsum(), 'title': 'Cumulative', 'path': str(tmp_path / 'cumsum.svg')},
+        ]
+        render_charts(charts, jobs=jobs)
+
+        with open(tmp_path / 'trends.png', 'rb') as f:
+            assert f.read(8) == b'\x89PNG\r\n\x1a\n'
+        with open(tmp_path / 'cumsum.svg') as f:
+            assert '<svg' in f.read()
+
+    def test_from_threads(self, tmp_path, series_df):
+        def render(name):
+            charts = [{'df': series_df, 'title': name, 'path': str(tmp_path / f'{name}{i}.json')} for i in range(2)]
+            render_charts(charts, jobs=2)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(render, ['a', 'b']))
+        assert len(list(tmp_path.glob('*.json'))) == 4
@@ -0,0 +1,38 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from adfire.hashing import siphash, hash_rows
+
+
+class TestSiphash:
+    @pytest.mark.parametrize('length, expected', [
+        (0, 0x726fdb47dd0e0e31),
+        (1, 0x74f839c593dc67fd),
+        (2, 0x0d6c8009d9a94f5a),
+        (8, 0x93f5f5799a932462),
+        (15, 0xa129ca6149be45e5),
+    ])
+    def test_reference_vectors(self, length, expected):
+        actual = siphash([bytes(range(length))], key=bytes(range(16)))
+        assert actual[0] == np.uint64(expected)
+
+    def test_on_many_lengths(self):
+        values = [bytes(range(i)) for i in range(20)]
+        expected = [siphash([value])[0] for value in values]
+        assert list(siphash(values)) == expected
+
+
+class TestHashRows:
+    def test_should_equal_pandas_hashes(self):
+        df = pd.DataFrame({
+            'date': [datetime.date(2024, 8, 4), datetime.date(2024, 8, 5), datetime.date(2024, 8, 4)],
+            'status': pd.Categorical(['posted', 'posted', 'pending']),
+            'repeat': [None, 'RRULE:FREQ=MONTHLY', np.nan],
+            'amount': [10.74, -0.5, np.nan],
+            'entity': ['85C Degrees', 'Café', 'Uniqlo'],
+        })
+        expected = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        np.testing.assert_array_equal(hash_rows(df), expected)
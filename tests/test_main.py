@@ -1,6 +1,8 @@
 import importlib
+import json
 import os
 import shutil
+import subprocess
 import sys
 from pathlib import Path
 
@@ -72,6 +74,33 @@ class TestLintMode:
         sys.argv = ['adfire', 'lint', '--path', str(tmp_path)]
         main()
 
+    def test_with_jobs(self, tmp_path, sample_path):
+        shutil.copytree(sample_path, tmp_path, dirs_exist_ok=True)
+
+        sys.argv = ['adfire', 'lint', '--path', str(tmp_path), '--jobs', '4']
+        main()
+
+    def test_with_stream(self, tmp_path, sample_path):
+        shutil.copytree(sample_path, tmp_path, dirs_exist_ok=True)
+
+        sys.argv = ['adfire', 'lint', '--path', str(tmp_path), '--stream']
+        main()
+        assert not (tmp_path / '.adfire').exists()
+
+    def test_with_profile(self, tmp_path, sample_path, capsys):
+        shutil.copytree(sample_path, tmp_path, dirs_exist_ok=True)
+
+        sys.argv = ['adfire', 'lint', '--path', str(tmp_path), '--profile']
+        main()
+        with open(tmp_path / '.reports/profile.json') as f:
+            records = json.load(f)
+        assert [r['stage'] for r in records] == [
+            'read', 'sort_entries', 'post_repeat_entries', 'fill_balances', 'assign_transactions', 'hash_entries',
+            'finalize'
+        ]
+        assert all(r['peak_memory'] > 0 for r in records)
+        assert 'peak_memory' in capsys.readouterr().out
+
     def test_default_path(self, tmp_path, sample_path):
         shutil.copytree(sample_path, tmp_path, dirs_exist_ok=True)
         os.chdir(tmp_path)
@@ -79,6 +108,13 @@ class TestLintMode:
         sys.argv = ['adfire', 'lint']
         main()
 
+    def test_with_filters(self, tmp_path, sample_formatted_path):
+        shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+        sys.argv = ['adfire', 'lint', '--path', str(tmp_path), '--account', 'Discover It', '-a', 'Wealthfront Individual',
+                    '--since', '2024-08-01', '--until', '2024-12-31']
+        main()
+        assert not (tmp_path / '.adfire/linted.pkl').exists()
+
 
 class TestFormat:
     def test_on_empty_dir(self, tmp_path):
@@ -107,6 +143,18 @@ class TestFormat:
         main()
         assert dir_is_equal(tmp_path, sample_formatted_path)
 
+    @pytest.mark.freeze_uuids(
+        side_effect='auto_increment',
+        values=['00000000-0000-0000-0000-000000000000', ]
+    )
+    @pytest.mark.parametrize('validation', ['full', 'boundary', 'off'])
+    def test_with_validation_levels(self, tmp_path, sample_path, sample_formatted_path, validation):
+        shutil.copytree(sample_path, tmp_path, dirs_exist_ok=True)
+
+        sys.argv = ['adfire', 'format', '--path', str(tmp_path), '--validate', validation]
+        main()
+        assert dir_is_equal(tmp_path, sample_formatted_path)
+
     @pytest.mark.freeze_uuids(
         side_effect='auto_increment',
         values=['00000000-0000-0000-0000-000000000000', ]
@@ -159,3 +207,47 @@ class TestView:
             actual_content = f.read()
 
         assert actual_content == "Hello, world from 'sample_view' module!"
+
+    def test_with_view_options(self, tmp_path, sample_formatted_path):
+        shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+        os.chdir(tmp_path)  # reports are written relative to the working directory
+
+        sys.argv = ['adfire', 'view', 'categories', '--format', 'json', '--path', str(tmp_path)]
+        main()
+
+        report_path = tmp_path / '.reports/categories'
+        assert (report_path / 'trends.json').is_file()
+        assert not (report_path / 'trends.png').exists()
+
+    def test_with_many_views(self, tmp_path, sample_formatted_path):
+        shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+        os.chdir(tmp_path)
+
+        sys.argv = ['adfire', 'view', 'balances', '+', 'categories', '--format', 'json', '-j', '2']
+        main()
+
+        assert (tmp_path / '.reports/balances/balances.csv').is_file()
+        assert (tmp_path / '.reports/categories/trends.json').is_file()
+
+
+def _imported_modules(*args, cwd) -> set[str]:
+    """Runs the CLI with import times traced, and returns names of top-level packages it imported"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-m', 'adfire', *args],
+        cwd=cwd, capture_output=True, text=True, check=True
+    )
+    lines = [line for line in result.stderr.splitlines() if line.startswith('import time:')]
+    return {line.rsplit('|', 1)[1].strip().split('.')[0] for line in lines[1:]}  # first line is a header
+
+
+class TestStartup:
+    @pytest.mark.parametrize('args', [['--version'], ['--help'], ['init']])
+    def test_should_not_import_scientific_stack_or_http(self, tmp_path, args):
+        modules = _imported_modules(*args, cwd=tmp_path)
+        assert not modules & {'pandas', 'pandera', 'numpy', 'matplotlib', 'http'}
+
+    def test_lint_should_not_import_matplotlib(self, tmp_path, sample_formatted_path):
+        shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+        modules = _imported_modules('lint', cwd=tmp_path)
+        assert 'pandas' in modules
+        assert 'matplotlib' not in modules
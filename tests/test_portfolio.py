@@ -1,9 +1,16 @@
+import datetime
 import os
 import shutil
 
+import numpy as np
+import pandas as pd
 import pytest
+from pandas.testing import assert_frame_equal, assert_series_equal
 
-from adfire.portfolio import Portfolio
+from adfire.bench import generate_portfolio
+from adfire.cache import read_cache
+from adfire import portfolio
+from adfire.portfolio import Portfolio, _group_paths_by_account
 
 
 class TestPortfolio:
@@ -26,6 +33,21 @@ class TestPortfolio:
             assert p._metadata
             assert p._merged_entry_dfs is None
 
+        def test_with_jobs(self, tmp_path, sample_path):
+            shutil.copytree(sample_path, tmp_path, dirs_exist_ok=True)
+            expected = Portfolio(tmp_path)._merged_entry_dfs
+            actual = Portfolio(tmp_path, jobs=4)._merged_entry_dfs
+            assert_frame_equal(actual, expected)
+
+        def test_with_validation(self, tmp_path, sample_path):
+            shutil.copytree(sample_path, tmp_path, dirs_exist_ok=True)
+            assert Portfolio(tmp_path, validation='boundary').validation == 'boundary'
+            with pytest.raises(ValueError, match="Validation must be one of full, boundary, off, not 'none'"):
+                Portfolio(tmp_path, validation='none')
+            p = Portfolio(tmp_path)
+            with pytest.raises(ValueError, match="Validation must be one of"):
+                p.validation = 'Full'
+
     class TestFromNew:
         def test_on_empty_dir(self, tmp_path):
             p = Portfolio.from_new(tmp_path)
@@ -44,3 +66,499 @@ class TestPortfolio:
             p = Portfolio.from_new(tmp_path)
             assert p._metadata
             assert p._merged_entry_dfs is not None
+
+    class TestLint:
+        def test_should_write_cache(self, tmp_path, sample_formatted_path):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            p = Portfolio(tmp_path)
+            df = p.lint()
+
+            cache = read_cache(tmp_path)
+            assert cache is not None
+            assert set(cache.checksums.index) == set(df.index.get_level_values('path'))
+            assert_frame_equal(cache.linted, df)
+
+        def test_should_use_cache_on_unchanged_files(self, tmp_path, sample_formatted_path):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            expected = Portfolio(tmp_path).lint()
+
+            actual = Portfolio(tmp_path).lint()
+            assert_frame_equal(actual, expected)
+
+        def test_should_lint_changed_accounts_like_full_lint(self, tmp_path, sample_formatted_path):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            Portfolio(tmp_path).lint()
+
+            path = tmp_path / 'accounts/wealthfront individual.csv'
+            with open(path, 'a') as f:
+                f.write('2024-08-25,posted,,-20.0,,,,,Venmo Personal,Wealthfront Individual,73,depository,checking,,,,\n')
+
+            p = Portfolio(tmp_path)
+            actual = p.lint()
+            p.use_cache = False
+            expected = p.lint()
+
+            columns = [c for c in expected.columns if c not in ['transaction_id', 'hash']]
+            assert_frame_equal(actual[columns].sort_index(), expected[columns].sort_index())
+
+        def test_should_not_lint_unaffected_accounts(self, tmp_path, sample_formatted_path):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            expected = Portfolio(tmp_path).lint()
+
+            path = tmp_path / 'accounts/discover it.csv'
+            with open(path, 'a') as f:
+                f.write('2024-11-30,posted,,1.0,,,,500.0,Kroger,Discover It,0152,credit,credit card,,,,\n')
+
+            actual = Portfolio(tmp_path).lint()
+            mask_unaffected = expected['account_name'] != 'Discover It'
+            assert_frame_equal(actual[actual['account_name'] != 'Discover It'], expected[mask_unaffected])
+            assert len(actual) == len(expected) + 1
+
+        def test_should_not_cache_forced_hashes(self, tmp_path, sample_formatted_path):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            path = tmp_path / 'accounts/discover it.csv'
+            path.write_text(path.read_text().replace('Kroger', 'Safeway'))
+
+            p = Portfolio(tmp_path)
+            p.forced_hash = True
+            p.lint()
+            assert read_cache(tmp_path) is None
+
+            with pytest.raises(AssertionError, match="Hashes don't match computed for accounts: Discover It"):
+                Portfolio(tmp_path).lint()
+
+        def test_should_not_use_cache_of_weaker_validation(self, tmp_path, sample_formatted_path):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            p = Portfolio(tmp_path)
+            p.validation = 'off'
+            p.lint()
+            assert read_cache(tmp_path).validation == 'off'
+
+            linted = []
+            p = Portfolio(tmp_path)
+            p.add_stage_hook(lambda metrics: linted.append(metrics['stage']))
+            p.lint()
+            assert 'finalize' in linted
+            assert read_cache(tmp_path).validation == 'full'
+
+            linted.clear()
+            p = Portfolio(tmp_path)
+            p.validation = 'boundary'
+            p.add_stage_hook(lambda metrics: linted.append(metrics['stage']))
+            p.lint()
+            assert linted == []
+
+        def test_should_write_checkpoints(self, tmp_path, sample_formatted_path):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            Portfolio(tmp_path).lint()
+
+            checkpoints = read_cache(tmp_path).checkpoints
+            discover = checkpoints[checkpoints['account_name'] == 'Discover It']
+            assert list(discover['date']) == [datetime.date(2024, 11, 30)]
+            assert list(discover['balance_current']) == [478.64]
+
+        def test_should_lint_from_checkpoint_before_changed_entries(self, tmp_path, sample_formatted_path):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            Portfolio(tmp_path).lint()
+
+            path = tmp_path / 'accounts/discover it.csv'
+            with open(path, 'a') as f:
+                f.write('2024-12-02,posted,,1.0,,,,500.0,Kroger,Discover It,0152,credit,credit card,,,,\n')
+
+            rows = {}
+            p = Portfolio(tmp_path)
+            p.add_stage_hook(lambda metrics: rows.update({metrics['stage']: metrics['rows']}))
+            actual = p.lint()
+            assert rows['fill_balances'] == 1
+
+            p.use_cache = False
+            expected = p.lint()
+            columns = [c for c in expected.columns if c not in ['transaction_id', 'hash']]
+            assert_frame_equal(actual[columns], expected[columns], check_categorical=False)
+            checkpoints = read_cache(tmp_path).checkpoints.drop(columns='hash')
+            assert_frame_equal(checkpoints, portfolio.balance_checkpoints(expected).drop(columns='hash'))
+
+        def test_should_lint_from_first_entry_if_changed_before_checkpoints(self, tmp_path, sample_formatted_path):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            Portfolio(tmp_path).lint()
+
+            path = tmp_path / 'accounts/discover it.csv'
+            with open(path, 'a') as f:
+                f.write('2024-11-30,posted,,1.0,,,,500.0,Kroger,Discover It,0152,credit,credit card,,,,\n')
+
+            rows = {}
+            p = Portfolio(tmp_path)
+            p.add_stage_hook(lambda metrics: rows.update({metrics['stage']: metrics['rows']}))
+            p.lint()
+            assert rows['fill_balances'] == 4
+
+    class TestFormat:
+        def test_should_only_write_changed_files(self, tmp_path, sample_path):
+            shutil.copytree(sample_path, tmp_path, dirs_exist_ok=True)
+            n_files = len(list((tmp_path / 'accounts').glob('*.csv')))
+            assert Portfolio(tmp_path).format() == n_files
+
+            mtimes = {item: item.stat().st_mtime_ns for item in (tmp_path / 'accounts').glob('*.csv')}
+            assert Portfolio(tmp_path).format() == 0
+            assert {item: item.stat().st_mtime_ns for item in mtimes} == mtimes
+
+            path = tmp_path / 'accounts/discover it.csv'
+            with open(path, 'a') as f:
+                f.write('2024-11-30,posted,,1.0,,,,500.0,Kroger,Discover It,0152,credit,credit card,,,,\n')
+            assert Portfolio(tmp_path).format() == 1
+            assert not any(item.name.endswith('.tmp') for item in (tmp_path / 'accounts').iterdir())
+
+    class TestLintInParallel:
+        def test_should_lint_like_sequential_lint(self, tmp_path, sample_formatted_path):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            p = Portfolio(tmp_path)
+            p.use_cache = False
+            expected = p.lint()
+
+            p = Portfolio(tmp_path, jobs=2)
+            p.use_cache = False
+            records = []
+            p.add_stage_hook(records.append)
+            actual = p.lint()
+
+            assert 'fill_entries_in_parallel' in [r['stage'] for r in records]
+            assert_frame_equal(actual.loc[expected.index], expected, check_categorical=False)
+
+        def test_should_group_paths_sharing_accounts(self):
+            groups = _group_paths_by_account([['a'], ['b'], ['a', 'c'], ['c'], []])
+            assert groups[0] == groups[2] == groups[3]
+            assert len({groups[0], groups[1], groups[4]}) == 3
+
+    class TestIterLint:
+        def test_should_lint_like_full_lint(self, tmp_path, sample_formatted_path):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            p = Portfolio(tmp_path)
+            p.use_cache = False
+            expected = p.lint()
+
+            dfs = list(p.iter_lint())
+            assert len(dfs) == 3  # one group per account file
+            actual = pd.concat(dfs).loc[expected.index]
+            assert_frame_equal(actual, expected, check_dtype=False, check_categorical=False)  # categories per group
+
+        def test_should_group_accounts_sharing_files(self, tmp_path, sample_formatted_path):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            with open(tmp_path / 'accounts/mixed.csv', 'w') as f:
+                f.write('date,status,amount,balance_limit,entity,account_name,account_mask,account_type,account_subtype\n')
+                f.write('2024-12-30,pending,1.0,500.0,Kroger,Discover It,0152,credit,credit card\n')
+                f.write('2024-12-30,pending,1.0,700.0,Kroger,Chase Freedom Student,6946,credit,credit card\n')
+
+            groups = [set(df['account_name']) for df in Portfolio(tmp_path).iter_lint()]
+            assert {'Discover It', 'Chase Freedom Student'} in groups
+            assert len(groups) == 2
+
+        def test_should_format_when_streaming(self, tmp_path, sample_path, sample_formatted_path):
+            shutil.copytree(sample_path, tmp_path, dirs_exist_ok=True)
+            p = Portfolio(tmp_path)
+            p.streaming = True
+            p.format()
+
+            p = Portfolio(tmp_path)
+            p.use_cache = False
+            expected = Portfolio(sample_formatted_path)
+            expected.use_cache = False
+            columns = [c for c in expected.lint().columns if c not in ['transaction_id', 'hash']]
+            actual_df = p.lint().droplevel('path')
+            expected_df = expected.lint().droplevel('path')
+            assert_frame_equal(actual_df[columns].sort_index(), expected_df[columns].sort_index(), check_like=True)
+
+    class TestStageHooks:
+        def test_should_call_hooks_for_each_stage(self, tmp_path, sample_path):
+            shutil.copytree(sample_path, tmp_path, dirs_exist_ok=True)
+            p = Portfolio(tmp_path)
+            records = []
+            p.add_stage_hook(records.append)
+            p.format()
+
+            assert [r['stage'] for r in records] == [
+                'read', 'sort_entries', 'post_repeat_entries', 'fill_balances', 'assign_transactions',
+                'hash_entries', 'finalize', 'write'
+            ]
+            assert records[-2]['rows'] == len(p.linted)
+            assert all(r['peak_memory'] is None for r in records)  # memory is not traced
+
+        def test_should_only_call_hooks_for_linted_stages(self, tmp_path, sample_formatted_path):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            Portfolio(tmp_path).lint()
+
+            p = Portfolio(tmp_path)
+            records = []
+            p.add_stage_hook(records.append)
+            p.lint()
+            assert records == []  # taken from the lint cache
+
+    class TestDtypes:
+        def test_should_keep_categoricals_after_incremental_lint(self, tmp_path, sample_formatted_path):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            Portfolio(tmp_path).lint()
+
+            path = tmp_path / 'accounts/discover it.csv'
+            with open(path, 'a') as f:
+                f.write('2024-11-30,posted,,1.0,,,,500.0,Kroger,Discover It,0152,credit,credit card,,,,\n')
+
+            df = Portfolio(tmp_path).lint()
+            columns = ['status', 'entity', 'account_name', 'account_mask', 'account_type', 'account_subtype', 'category']
+            assert all(isinstance(df[c].dtype, pd.CategoricalDtype) for c in columns)
+            assert set(df['account_name'].cat.categories) == {'Chase Freedom Student', 'Discover It',
+                                                              'Wealthfront Individual'}
+
+    class TestWatch:
+        def test_should_lint_again_on_change(self, tmp_path, sample_formatted_path, monkeypatch):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            p = Portfolio(tmp_path)
+            results = p.watch(interval=0.01)
+            n_entries = len(next(results))
+
+            read_paths = []
+            read_entry_file = portfolio._read_entry_file
+            monkeypatch.setattr(
+                portfolio, '_read_entry_file', lambda item: read_paths.append(item) or read_entry_file(item))
+
+            path = tmp_path / 'accounts/discover it.csv'
+            with open(path, 'a') as f:
+                f.write('2024-11-30,posted,,1.0,,,,500.0,Kroger,Discover It,0152,credit,credit card,,,,\n')
+            actual = next(results)
+            assert len(actual) == n_entries + 1
+            assert read_paths == [path.resolve()]  # only the changed entry file is read again
+            assert p.linted.equals(actual)
+
+            expected = Portfolio(tmp_path)
+            expected.use_cache = False
+            columns = [c for c in actual.columns if c not in ['transaction_id', 'hash']]
+            assert_frame_equal(actual[columns].sort_index(), expected.lint()[columns].sort_index(),
+                               check_categorical=False)
+
+        def test_should_yield_errors_and_recover(self, tmp_path, sample_formatted_path):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            results = Portfolio(tmp_path).watch(interval=0.01)
+            n_entries = len(next(results))
+
+            path = tmp_path / 'accounts/discover it.csv'
+            content = path.read_text()
+            path.write_text(content + '2024-11-30,posted,,1.0,1000.0,,,500.0,Kroger,Discover It,0152,credit,credit card,,,,\n')
+            assert isinstance(next(results), AssertionError)
+
+            path.write_text(content + '2024-11-30,posted,,1.0,,,,500.0,Kroger,Discover It,0152,credit,credit card,,,,\n')
+            assert len(next(results)) == n_entries + 1
+
+    class TestLinted:
+        def test_should_load_snapshot_after_format(self, tmp_path, sample_path):
+            shutil.copytree(sample_path, tmp_path, dirs_exist_ok=True)
+            p = Portfolio(tmp_path)
+            p.format()
+            expected = p.linted
+
+            p = Portfolio(tmp_path)
+            actual = p.linted
+            assert '_merged_entry_dfs' not in vars(p)  # entry files were not read
+            assert actual.equals(expected)
+
+        def test_should_lint_if_entry_files_modified_after_format(self, tmp_path, sample_path):
+            shutil.copytree(sample_path, tmp_path, dirs_exist_ok=True)
+            Portfolio(tmp_path).format()
+
+            path = tmp_path / 'accounts/discover it.csv'
+            with open(path, 'a') as f:
+                f.write('2024-11-30,posted,,1.0,,,,500.0,Kroger,Discover It,0152,credit,credit card,,,,\n')
+
+            p = Portfolio(tmp_path)
+            df = p.linted
+            assert '_merged_entry_dfs' in vars(p)
+            assert df['amount'].iloc[-1] == 1.0
+
+        def test_should_lint_if_entry_files_modified_with_same_size_and_time(self, tmp_path, sample_path):
+            shutil.copytree(sample_path, tmp_path, dirs_exist_ok=True)
+            Portfolio(tmp_path).format()
+
+            path = tmp_path / 'accounts/discover it.csv'
+            stat = path.stat()
+            content = path.read_text()
+            path.write_text(content.replace('Kroger', 'Krogex', 1))
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+            p = Portfolio(tmp_path)
+            p.forced_hash = True
+            df = p.linted
+            assert '_merged_entry_dfs' in vars(p)
+            assert 'Krogex' in set(df['entity'])
+
+        def test_should_not_load_snapshot_of_weaker_validation(self, tmp_path, sample_path):
+            shutil.copytree(sample_path, tmp_path, dirs_exist_ok=True)
+            Portfolio(tmp_path, validation='off').format()
+
+            p = Portfolio(tmp_path, validation='boundary')
+            p.linted
+            assert '_merged_entry_dfs' in vars(p)
+
+            p = Portfolio(tmp_path, validation='off')
+            p.linted
+            assert '_merged_entry_dfs' not in vars(p)
+
+        def test_should_not_change_on_modified_copies(self, tmp_path, sample_formatted_path):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            with pd.option_context('mode.copy_on_write', True):
+                p = Portfolio(tmp_path)
+                expected = p.linted.copy()
+
+                df = p.linted
+                df['amount'] *= 2
+                df.loc[df['status'] == 'posted', 'balance_total'] = 0.0
+                df['month'] = 1
+                df.drop(columns='category', inplace=True)
+
+                assert_frame_equal(p.linted, expected)
+
+        def test_should_not_change_on_replaced_columns_of_copies(self, tmp_path, sample_formatted_path):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            p = Portfolio(tmp_path)
+            expected = p.linted.copy()
+
+            df = p.linted
+            df['amount'] = df['amount'] * 2
+            df['month'] = 1
+            df.drop(columns='category', inplace=True)
+
+            assert_frame_equal(p.linted, expected)
+
+        @pytest.mark.parametrize('copy_on_write', [True, False])
+        def test_should_share_data_of_copies(self, tmp_path, sample_formatted_path, copy_on_write):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            with pd.option_context('mode.copy_on_write', copy_on_write):
+                p = Portfolio(tmp_path)
+                assert np.shares_memory(p.linted['amount'].to_numpy(), p.linted['amount'].to_numpy())
+
+        def test_should_not_enable_copy_on_write_on_import(self):
+            assert not pd.get_option('mode.copy_on_write')
+
+    class TestFilters:
+        def test_should_only_read_entry_files_of_accounts(self, tmp_path, sample_formatted_path, monkeypatch):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            expected = Portfolio(tmp_path).lint()
+
+            read_paths = []
+            read_entry_file = portfolio._read_entry_file
+            monkeypatch.setattr(
+                portfolio, '_read_entry_file', lambda item: read_paths.append(item) or read_entry_file(item))
+
+            p = Portfolio(tmp_path, accounts=['Discover It'])
+            p.use_cache = False
+            actual = p.lint()
+            assert read_paths == [(tmp_path / 'accounts/discover it.csv').resolve()]
+            assert_frame_equal(actual, expected[expected['account_name'] == 'Discover It'], check_categorical=False)
+
+        def test_should_read_entry_files_of_paired_accounts(self, tmp_path, sample_formatted_path):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            p = Portfolio(tmp_path, accounts=['Chase Freedom Student'])
+            p.lint()
+            paths = set(p._merged_entry_dfs.index.get_level_values('path'))
+            assert paths == {str((tmp_path / f'accounts/{name}.csv').resolve())
+                             for name in ['chase freedom student', 'wealthfront individual']}
+
+        def test_with_dates(self, tmp_path, sample_formatted_path):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            expected = Portfolio(tmp_path).lint()
+            dates = pd.to_datetime(expected['date'])
+            expected = expected[(dates >= '2024-08-16') & (dates <= '2024-08-31')]
+
+            actual = Portfolio(tmp_path, since=datetime.date(2024, 8, 16), until=datetime.date(2024, 8, 31)).linted
+            assert_frame_equal(actual, expected)
+
+        def test_should_not_read_entry_files_before_since(self, tmp_path, monkeypatch):
+            generate_portfolio(tmp_path, accounts=2, years=2, entries_per_year=50, repeat_share=0)
+            Portfolio(tmp_path).format()
+            Portfolio(tmp_path).lint()
+            path = tmp_path / 'accounts/Checking 0/2001.csv'
+            with open(path, 'a') as f:
+                f.write('2001-12-31,posted,,12.34,,,,,Kroger,Checking 0,0000,depository,checking,,,,\n')
+
+            read_paths = []
+            read_entry_file = portfolio._read_entry_file
+            monkeypatch.setattr(
+                portfolio, '_read_entry_file', lambda item: read_paths.append(item) or read_entry_file(item))
+
+            actual = Portfolio(tmp_path, since=datetime.date(2001, 6, 1)).lint()
+            assert set(read_paths) == {path.resolve(), (tmp_path / 'accounts/Credit 1/2001.csv').resolve()}
+
+            p = Portfolio(tmp_path, since=datetime.date(2001, 6, 1))
+            p.use_cache = False
+            expected = p.lint()
+            columns = ['transaction_id', 'hash']  # assigned randomly to new entries
+            assert_frame_equal(actual.drop(columns=columns).sort_index(), expected.drop(columns=columns).sort_index(),
+                               check_categorical=False)
+
+        def test_should_read_settled_entry_files_of_accounts_changed_before(self, tmp_path):
+            generate_portfolio(tmp_path, accounts=4, years=3, entries_per_year=60, repeat_share=0,
+                               transfer_share=0.2, seed=1)
+            Portfolio(tmp_path).lint()
+            with open(tmp_path / 'accounts/Checking 0/2000.csv', 'a') as f:
+                f.write('2000-03-20,posted,,-1.0,,Kroger,Checking 0,0000,depository,checking,\n')
+
+            p = Portfolio(tmp_path, since=datetime.date(2002, 6, 1))
+            p.use_cache = False
+            expected = p.lint()['balance_current'].sort_index()
+            actual = Portfolio(tmp_path, since=datetime.date(2002, 6, 1)).lint()['balance_current'].sort_index()
+            assert_series_equal(actual, expected)
+
+            p = Portfolio(tmp_path)
+            p.use_cache = False
+            expected = p.lint()['balance_current'].sort_index()
+            actual = Portfolio(tmp_path).lint()['balance_current'].sort_index()  # from the cache written above
+            assert_series_equal(actual, expected)
+
+        def test_should_not_write_cache(self, tmp_path, sample_formatted_path):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            Portfolio(tmp_path, accounts=['Discover It']).lint()
+            assert read_cache(tmp_path) is None
+
+        def test_should_filter_cache(self, tmp_path, sample_formatted_path):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            expected = Portfolio(tmp_path).lint()
+            actual = Portfolio(tmp_path, accounts=['Discover It', 'Chase Freedom Student']).lint()
+            assert set(actual['account_name']) == {'Discover It', 'Chase Freedom Student'}
+            assert_frame_equal(actual, expected[expected['account_name'] != 'Wealthfront Individual'])
+
+        def test_on_missing_accounts(self, tmp_path, sample_formatted_path):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            with pytest.raises(ValueError, match='Accounts not found: Amex'):
+                Portfolio(tmp_path, accounts=['Amex', 'Discover It']).lint()
+
+        def test_format(self, tmp_path, sample_formatted_path):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            with pytest.raises(ValueError, match="Can't format a portfolio filtered by accounts or dates"):
+                Portfolio(tmp_path, since=datetime.date(2024, 8, 16)).format()
+
+    class TestViewAll:
+        @pytest.mark.parametrize('jobs', [1, 2])
+        def test_should_lint_once_for_all_views(self, tmp_path, sample_formatted_path, jobs):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            p = Portfolio(tmp_path, jobs=jobs)
+            p.use_cache = False
+            records = []
+            p.add_stage_hook(records.append)
+
+            reports_path = tmp_path / '.reports'
+            p.view_all([('balances', []), ('categories', ['--format', 'json']), ('tests.sample_view', [])],
+                       reports_path=reports_path)
+
+            assert [r['stage'] for r in records].count('sort_entries') == 1
+            assert (reports_path / 'balances/balances.csv').is_file()
+            assert (reports_path / 'categories/trends.json').is_file()
+            assert (reports_path / 'tests.sample_view/out.txt').is_file()  # run as a script
+
+        def test_should_not_change_working_directory(self, tmp_path, sample_formatted_path):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            cwd = os.getcwd()
+            Portfolio(tmp_path).view_all([('tests.sample_view', [])], reports_path=tmp_path / '.reports')
+            assert os.getcwd() == cwd
+
+        def test_with_uninstalled_view_module(self, tmp_path, sample_formatted_path):
+            shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+            p = Portfolio(tmp_path)
+            with pytest.raises(ImportError, match='No module named uninstalled_module'):
+                p.view_all([('balances', []), ('uninstalled_module', [])], reports_path=tmp_path / '.reports')
+            assert not (tmp_path / '.reports').exists()  # no view ran
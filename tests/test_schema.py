@@ -6,7 +6,7 @@ import pandas.testing as tm
 import pytest
 from pandera.errors import SchemaError
 
-from adfire.schema import InputEntrySchema
+from adfire.schema import InputEntrySchema, HashableEntrySchema, schema_columns, required_columns
 
 
 class TestInputEntrySchema:
@@ -52,6 +52,13 @@ class TestInputEntrySchema:
         )
         actual = InputEntrySchema.validate(df)
 
+        # low-cardinality columns are categoricals
+        expected = expected.astype({
+            name: 'category'
+            for name in ['status', 'entity', 'account_name', 'account_mask', 'account_type', 'account_subtype']
+        })
+        expected['category'] = pd.Categorical([None], categories=pd.Index([], dtype=object))
+        expected['hash'] = pd.array([None], dtype='UInt64')
         tm.assert_frame_equal(expected, actual)
 
     def test_missing_required_col(self):
@@ -69,3 +76,14 @@ class TestInputEntrySchema:
 
         with pytest.raises(SchemaError, match="column 'amount'"):
             InputEntrySchema.validate(df)
+
+
+class TestHashableEntrySchema:
+    def test_schema_is_built_once(self):
+        assert HashableEntrySchema.to_schema() is HashableEntrySchema.to_schema()
+
+    def test_columns(self):
+        assert 'hash' not in schema_columns(HashableEntrySchema)
+        assert schema_columns(HashableEntrySchema) is schema_columns(HashableEntrySchema)
+        assert set(required_columns(HashableEntrySchema)) == set(schema_columns(HashableEntrySchema)) - {
+            'repeat', 'balance_available', 'balance_limit', 'balance_total'}
@@ -0,0 +1,106 @@
+import json
+import os
+import shutil
+import sys
+import threading
+
+import pytest
+
+import adfire.portfolio
+from adfire.__main__ import main
+from adfire.portfolio import Portfolio
+from adfire.serve import PortfolioServer, ServeError, request_server
+
+
+@pytest.fixture
+def server(tmp_path, sample_formatted_path):
+    shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+    server = PortfolioServer(Portfolio(tmp_path))
+    server.write_info()
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join()
+    server.server_close()
+    server.remove_info()
+
+
+class TestRequestServer:
+    def test_lint(self, tmp_path, server):
+        response = request_server(tmp_path, {'command': 'lint', 'cwd': str(tmp_path)})
+        assert response == {'output': '', 'error': None}
+
+    def test_lint_with_invalid_entries(self, tmp_path, server):
+        with open(tmp_path / 'accounts/discover it.csv', 'a') as f:
+            f.write('2024-11-30,posted,,1.0,1000.0,,,500.0,Kroger,Discover It,0152,credit,credit card,,,,\n')
+
+        response = request_server(tmp_path, {'command': 'lint', 'cwd': str(tmp_path)})
+        assert response['error'] == "AssertionError: Current balances don't match computed for accounts: Discover It"
+
+    def test_views_twice(self, tmp_path, server):
+        for _ in range(2):
+            for module in ['balances', 'categories']:
+                request = {'command': 'view', 'views': [[module, []]], 'cwd': str(tmp_path)}
+                assert request_server(tmp_path, request)['error'] is None
+        assert (tmp_path / '.reports/balances/balances.csv').is_file()
+        assert (tmp_path / '.reports/categories/categories.csv').is_file()
+
+    def test_without_server(self, tmp_path):
+        assert request_server(tmp_path, {'command': 'lint', 'cwd': str(tmp_path)}) is None
+
+    def test_with_other_settings(self, tmp_path, server):
+        request = {'command': 'lint', 'cwd': str(tmp_path)}
+        settings = {'validation': 'full', 'use_cache': True, 'forced_hash': False}
+        assert request_server(tmp_path, request, settings=settings) == {'output': '', 'error': None}
+        assert request_server(tmp_path, request, settings={**settings, 'validation': 'off'}) is None
+
+    def test_with_stale_info(self, tmp_path, server):
+        with open(tmp_path / '.adfire/serve.json') as f:
+            info = json.load(f)
+        info['token'] = 'stale'
+        with open(tmp_path / '.adfire/serve.json', 'w') as f:
+            json.dump(info, f)
+
+        assert request_server(tmp_path, {'command': 'lint', 'cwd': str(tmp_path)}) is None
+
+
+class TestDelegation:
+    def test_lint(self, tmp_path, server, monkeypatch):
+        monkeypatch.setattr(adfire.portfolio, 'Portfolio', None)  # not linted locally
+
+        sys.argv = ['adfire', 'lint', '--path', str(tmp_path)]
+        main()
+
+    def test_lint_with_invalid_entries(self, tmp_path, server):
+        with open(tmp_path / 'accounts/discover it.csv', 'a') as f:
+            f.write('2024-11-30,posted,,1.0,1000.0,,,500.0,Kroger,Discover It,0152,credit,credit card,,,,\n')
+
+        sys.argv = ['adfire', 'lint', '--path', str(tmp_path)]
+        with pytest.raises(ServeError, match="Current balances don't match computed"):
+            main()
+
+    def test_lint_with_weaker_validation_of_server(self, tmp_path, server, monkeypatch):
+        server.portfolio.validation = 'off'
+        server.write_info()
+        linted = []
+        monkeypatch.setattr(Portfolio, 'lint', lambda self: linted.append(self.validation))
+
+        sys.argv = ['adfire', 'lint', '--path', str(tmp_path)]
+        main()
+        assert linted == ['full']
+
+    def test_serve_with_filters(self, tmp_path, sample_formatted_path):
+        shutil.copytree(sample_formatted_path, tmp_path, dirs_exist_ok=True)
+        sys.argv = ['adfire', 'serve', '--path', str(tmp_path), '--account', 'Discover It']
+        with pytest.raises(SystemExit):
+            main()
+        assert not (tmp_path / '.adfire/serve.json').exists()
+
+    def test_view(self, tmp_path, server, monkeypatch):
+        monkeypatch.setattr(adfire.portfolio, 'Portfolio', None)
+        os.chdir(tmp_path)
+
+        sys.argv = ['adfire', 'view', 'balances']
+        main()
+        assert (tmp_path / '.reports/balances/balances.csv').is_file()
@@ -0,0 +1,37 @@
+import json
+
+import pandas as pd
+
+from adfire.stages import StageProfiler, run_stage
+
+
+class TestRunStage:
+    def test_without_hooks(self):
+        assert run_stage('add', lambda a, b: a + b, 1, b=2) == 3
+
+    def test_with_hooks(self):
+        records = []
+        df = run_stage('make', lambda n: pd.DataFrame({'a': range(n)}), 3, hooks=[records.append])
+
+        assert len(df) == 3
+        assert len(records) == 1
+        assert records[0]['stage'] == 'make'
+        assert records[0]['rows'] == 3
+        assert records[0]['seconds'] >= 0
+        assert records[0]['peak_memory'] is None
+
+
+class TestStageProfiler:
+    def test_should_record_peak_memory(self, tmp_path):
+        with StageProfiler() as profiler:
+            run_stage('small', lambda: bytearray(1000), hooks=[profiler])
+            run_stage('large', lambda: bytearray(10_000_000), hooks=[profiler])
+
+        df = profiler.to_frame()
+        assert list(df['stage']) == ['small', 'large']
+        assert df['rows'].isna().all()
+        assert df['peak_memory'].iloc[0] < 10_000_000 <= df['peak_memory'].iloc[1]
+
+        profiler.write(tmp_path / 'reports/profile.json')
+        with open(tmp_path / 'reports/profile.json') as f:
+            assert json.load(f) == profiler.records
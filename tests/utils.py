@@ -19,6 +19,7 @@ def open_or_none(filename, mode='r'):
 def dir_is_equal(dir1: Path, dir2: Path) -> bool:
     """
     Compare two directories recursively to check if they contain the same items.
+    Hidden items (and their children) are ignored, like Adfire does.
 
     Parameters:
     - dir1: Path to the first directory
@@ -39,6 +40,8 @@ def dir_is_equal(dir1: Path, dir2: Path) -> bool:
     # Get lists of all files and directories in both dirs
     dir1_items = {item.relative_to(dir1) for item in dir1.rglob('*')}
     dir2_items = {item.relative_to(dir2) for item in dir2.rglob('*')}
+    dir1_items = {item for item in dir1_items if not any(part.startswith('.') for part in item.parts)}
+    dir2_items = {item for item in dir2_items if not any(part.startswith('.') for part in item.parts)}
 
     # Compare the sets of items
     if dir1_items != dir2_items: